@@ -0,0 +1 @@
+"""Benchmarks for tutorial code helper functions."""
@@ -0,0 +1,52 @@
+"""Benchmark cookbook1.clean_customer_data against the original Series.apply implementation.
+
+Run from the repository root inside the jupyterlab container:
+    python -m benchmarks.benchmark_clean_customer_data --rows 1000000 10000000
+"""
+
+import argparse
+
+import pandas as pd
+import tutorial_code as tutorial
+
+from benchmarks.synthetic_data import generate_raw_customer_data
+from benchmarks.timing import best_of, print_result
+
+
+def clean_customer_data_apply(df_original: pd.DataFrame) -> pd.DataFrame:
+    """Original row-wise implementation of cookbook1.clean_customer_data."""
+    df = df_original.copy()
+    df = df.rename(columns=tutorial.cookbook1.RENAME_COLUMNS)
+
+    df["country"] = df["country"].apply(
+        lambda x: tutorial.cookbook1.COUNTRY_NAME_TO_CODE[x]
+    )
+    df["city"] = df["city"].apply(lambda x: x.title())
+
+    return df[tutorial.cookbook1.RETAIN_COLUMNS]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rows", type=int, nargs="+", default=[1_000_000, 10_000_000])
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    for n_rows in args.rows:
+        df_raw = generate_raw_customer_data(n_rows)
+
+        # Check that both implementations produce the same result before timing.
+        pd.testing.assert_frame_equal(
+            clean_customer_data_apply(df_raw),
+            tutorial.cookbook1.clean_customer_data(df_raw),
+        )
+
+        baseline = best_of(lambda: clean_customer_data_apply(df_raw), args.repeat)
+        candidate = best_of(
+            lambda: tutorial.cookbook1.clean_customer_data(df_raw), args.repeat
+        )
+        print_result("clean_customer_data", n_rows, baseline, candidate)
+
+
+if __name__ == "__main__":
+    main()
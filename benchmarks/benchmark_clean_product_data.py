@@ -0,0 +1,88 @@
+"""Benchmark cookbook2.clean_product_data against the original per-cell currency parsing.
+
+The synthetic products are written to and read back from a CSV file, so currency figures
+are parsed from the same string values as in the pipeline.
+
+Run from the repository root inside the jupyterlab container:
+    python -m benchmarks.benchmark_clean_product_data --rows 1000000 5000000
+"""
+
+import argparse
+import pathlib
+import tempfile
+from typing import Tuple
+
+import pandas as pd
+import tutorial_code as tutorial
+
+from benchmarks.synthetic_data import generate_raw_product_data
+from benchmarks.timing import best_of, peak_memory, print_memory_result, print_result
+
+
+def clean_product_data_apply(
+    df_original: pd.DataFrame,
+) -> Tuple[pd.DataFrame, pd.DataFrame, pd.DataFrame]:
+    """Original per-cell implementation of cookbook2.clean_product_data."""
+    df_products = df_original.copy()
+    df_products = df_products.rename(columns=tutorial.cookbook2.RENAME_COLUMNS)
+
+    for currency_col in ["unit_cost_usd", "unit_price_usd"]:
+        df_products[currency_col] = df_products[currency_col].apply(
+            lambda x: float(x.replace("$", "").replace(",", "").strip())
+        )
+
+    df_product_categories = (
+        df_products[["product_category_id", "product_category_name"]]
+        .copy()
+        .drop_duplicates()
+        .reset_index(drop=True)
+        .rename(columns={"product_category_name": "name"})
+    )
+
+    df_product_subcategories = (
+        df_products[["product_subcategory_id", "product_subcategory_name"]]
+        .copy()
+        .drop_duplicates()
+        .reset_index(drop=True)
+        .rename(columns={"product_subcategory_name": "name"})
+    )
+
+    df_products = df_products[tutorial.cookbook2.PRODUCT_RETAIN_COLUMNS]
+
+    return df_products, df_product_categories, df_product_subcategories
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rows", type=int, nargs="+", default=[1_000_000, 5_000_000])
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    for n_rows in args.rows:
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            filepath = pathlib.Path(tmp_dir) / "products.csv"
+            generate_raw_product_data(n_rows).to_csv(filepath, index=False)
+            df_raw = pd.read_csv(filepath)
+
+        # Check that both implementations produce the same result before timing.
+        for df_baseline, df_candidate in zip(
+            clean_product_data_apply(df_raw),
+            tutorial.cookbook2.clean_product_data(df_raw),
+        ):
+            pd.testing.assert_frame_equal(df_baseline, df_candidate)
+
+        baseline = best_of(lambda: clean_product_data_apply(df_raw), args.repeat)
+        candidate = best_of(
+            lambda: tutorial.cookbook2.clean_product_data(df_raw), args.repeat
+        )
+        print_result("clean_product_data", n_rows, baseline, candidate)
+
+        baseline = peak_memory(lambda: clean_product_data_apply(df_raw))
+        candidate = peak_memory(lambda: tutorial.cookbook2.clean_product_data(df_raw))
+        print_memory_result(
+            "clean_product_data peak memory", n_rows, baseline, candidate
+        )
+
+
+if __name__ == "__main__":
+    main()
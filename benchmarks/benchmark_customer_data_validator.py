@@ -0,0 +1,56 @@
+"""Benchmark per-batch latency of cookbook1.CustomerDataValidator against validate_customer_data.
+
+Run from the repository root inside the jupyterlab container:
+    python -m benchmarks.benchmark_customer_data_validator --batch-rows 1000 10000
+"""
+
+import argparse
+import time
+
+import tutorial_code as tutorial
+
+from benchmarks.synthetic_data import generate_raw_customer_data
+
+
+def mean_batch_latency(validate, batches) -> float:
+    """Return the mean wall-clock time in seconds to validate each batch."""
+    start = time.perf_counter()
+
+    for df_batch in batches:
+        validate(df_batch)
+
+    return (time.perf_counter() - start) / len(batches)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--batch-rows", type=int, nargs="+", default=[1_000, 10_000])
+    parser.add_argument("--batches", type=int, default=20)
+    args = parser.parse_args()
+
+    for batch_rows in args.batch_rows:
+        df_customers = tutorial.cookbook1.clean_customer_data(
+            generate_raw_customer_data(batch_rows * args.batches)
+        )
+        batches = [
+            df_customers.iloc[i : i + batch_rows]
+            for i in range(0, df_customers.shape[0], batch_rows)
+        ]
+
+        baseline = mean_batch_latency(
+            tutorial.cookbook1.validate_customer_data, batches
+        )
+
+        validator = tutorial.cookbook1.CustomerDataValidator()
+        candidate = mean_batch_latency(validator.validate, batches)
+
+        print(
+            f"{'customer data validation':<40} batch_rows={batch_rows:>9,} "
+            f"validate_customer_data={baseline * 1_000:>8.1f}ms/batch "
+            f"CustomerDataValidator={candidate * 1_000:>8.1f}ms/batch "
+            f"speedup={baseline / candidate:>6.1f}x"
+        )
+
+
+if __name__ == "__main__":
+    main()
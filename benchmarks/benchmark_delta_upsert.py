@@ -0,0 +1,89 @@
+"""Benchmark db.delta_upsert_dataframe_to_postgres against db.bulk_insert_ignore_dataframe_to_postgres.
+
+Both load a repeated full extract of customer data, of which 1% of rows are changed,
+into a table that already holds the previous extract. Requires the docker compose
+Postgres service. Rows are loaded into a scratch copy of the customers table, which is
+dropped when the benchmark completes.
+
+Run from the repository root inside the jupyterlab container:
+    python -m benchmarks.benchmark_delta_upsert --rows 100000 1000000
+"""
+
+import argparse
+import time
+
+import tutorial_code as tutorial
+
+from benchmarks.synthetic_data import generate_raw_customer_data
+
+BENCHMARK_TABLE_NAME = "benchmark_customers"
+
+CHANGED_ROW_FRACTION = 0.01
+
+
+def timed_reload(load, df_previous, df_customers) -> float:
+    """Return the wall-clock time in seconds to load rows into a table holding the previous extract."""
+    tutorial.db.drop_all_table_rows(BENCHMARK_TABLE_NAME)
+    drop_row_hashes()
+    load(BENCHMARK_TABLE_NAME, df_previous)
+
+    start = time.perf_counter()
+    load(BENCHMARK_TABLE_NAME, df_customers)
+
+    return time.perf_counter() - start
+
+
+def drop_row_hashes() -> None:
+    """Remove the stored row hashes of the benchmark table."""
+    tutorial.db._run_query(
+        f"delete from {tutorial.db.ROW_HASH_TABLE_NAME} where table_name = :table_name",
+        parameters={"table_name": BENCHMARK_TABLE_NAME},
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rows", type=int, nargs="+", default=[100_000, 1_000_000])
+    args = parser.parse_args()
+
+    tutorial.db._run_query(
+        f"create table if not exists {BENCHMARK_TABLE_NAME} (like customers including all)"
+    )
+    drop_row_hashes()
+
+    try:
+        for n_rows in args.rows:
+            df_previous = tutorial.cookbook1.clean_customer_data(
+                generate_raw_customer_data(n_rows)
+            )
+
+            df_customers = df_previous.copy()
+            changed_rows = df_customers.sample(
+                frac=CHANGED_ROW_FRACTION, random_state=0
+            )
+            df_customers.loc[changed_rows.index, "city"] = "Sesame Street"
+
+            baseline = timed_reload(
+                tutorial.db.bulk_insert_ignore_dataframe_to_postgres,
+                df_previous,
+                df_customers,
+            )
+            candidate = timed_reload(
+                tutorial.db.delta_upsert_dataframe_to_postgres,
+                df_previous,
+                df_customers,
+            )
+
+            print(
+                f"{'reload 1% changed extract':<40} rows={n_rows:>12,} "
+                f"insert_ignore={baseline:>9.3f}s delta={candidate:>9.3f}s "
+                f"speedup={baseline / candidate:>6.1f}x"
+            )
+    finally:
+        tutorial.db.drop_all_table_rows(BENCHMARK_TABLE_NAME)
+        tutorial.db._run_query(f"drop table if exists {BENCHMARK_TABLE_NAME}")
+        drop_row_hashes()
+
+
+if __name__ == "__main__":
+    main()
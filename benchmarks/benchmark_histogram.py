@@ -0,0 +1,79 @@
+"""Benchmark cookbook3 histogram prep against the original pd.cut and row-wise apply prep.
+
+Run from the repository root inside the jupyterlab container:
+    python -m benchmarks.benchmark_histogram --rows 1000000 10000000
+"""
+
+import argparse
+
+import numpy as np
+import pandas as pd
+import tutorial_code as tutorial
+
+from benchmarks.timing import best_of, print_result
+
+
+def prep_income_histogram_apply(incomes: pd.Series, bins: list) -> pd.DataFrame:
+    """Original pd.cut and row-wise apply prep of the customer income histogram."""
+    df_hist = pd.cut(incomes, bins=bins).value_counts(sort=False).reset_index()
+    df_hist.columns = ["binterval", "count"]
+
+    def convert_bin_to_tooltip(x):
+        if x.left == 0:
+            return "Less than $10k"
+        elif x.right == 100000:
+            return "$90k+"
+        else:
+            return f"${int(x.left / 1000)}k-{int(x.right / 1000)}k"
+
+    df_hist["binterval_str"] = df_hist["binterval"].apply(convert_bin_to_tooltip)
+    df_hist["bin_lower"] = df_hist.apply(lambda x: x["binterval"].left, axis=1)
+    df_hist["bin_mid"] = df_hist.apply(lambda x: x["binterval"].mid, axis=1)
+    df_hist["bin_upper"] = df_hist.apply(lambda x: x["binterval"].right, axis=1)
+
+    df_hist = df_hist[["binterval_str", "bin_lower", "bin_mid", "bin_upper", "count"]]
+
+    return df_hist.sort_values(by="bin_lower").reset_index(drop=True)
+
+
+def prep_income_histogram_numpy(incomes: pd.Series, bins: list) -> pd.DataFrame:
+    """Vectorized prep of the customer income histogram, as used by cookbook3."""
+    bin_edges = np.asarray(bins)
+    counts = tutorial.cookbook3._count_values_in_bins(incomes.to_numpy(), bin_edges)
+
+    return tutorial.cookbook3._histogram_frame(
+        bin_edges, counts, tutorial.cookbook3._format_income_bin_labels
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rows", type=int, nargs="+", default=[1_000_000, 10_000_000])
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    bins = [x * 1_000 for x in tutorial.cookbook3.BINS]
+    rng = np.random.default_rng(args.seed)
+
+    for n_rows in args.rows:
+        incomes = pd.Series(rng.integers(1, 100_000, size=n_rows), name="income")
+
+        # Check that both implementations produce the same result before timing.
+        pd.testing.assert_frame_equal(
+            prep_income_histogram_apply(incomes, bins).astype({"binterval_str": str}),
+            prep_income_histogram_numpy(incomes, bins),
+            check_dtype=False,
+        )
+
+        baseline = best_of(
+            lambda: prep_income_histogram_apply(incomes, bins), args.repeat
+        )
+        candidate = best_of(
+            lambda: prep_income_histogram_numpy(incomes, bins), args.repeat
+        )
+        print_result("histogram prep", n_rows, baseline, candidate)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,65 @@
+"""Benchmark db.bulk_insert_ignore_dataframe_to_postgres against db.insert_ignore_dataframe_to_postgres.
+
+Requires the docker compose Postgres service. Rows are inserted into a scratch copy of
+the customers table, which is dropped when the benchmark completes.
+
+Run from the repository root inside the jupyterlab container:
+    python -m benchmarks.benchmark_insert_ignore_dataframe_to_postgres --rows 100000 1000000
+"""
+
+import argparse
+import time
+
+import tutorial_code as tutorial
+
+from benchmarks.synthetic_data import generate_raw_customer_data
+
+BENCHMARK_TABLE_NAME = "benchmark_customers"
+
+
+def timed_insert(insert, df_customers) -> float:
+    """Return the wall-clock time in seconds to insert rows into an empty scratch table."""
+    tutorial.db.drop_all_table_rows(BENCHMARK_TABLE_NAME)
+
+    start = time.perf_counter()
+    rows_inserted = insert(table_name=BENCHMARK_TABLE_NAME, dataframe=df_customers)
+    elapsed = time.perf_counter() - start
+
+    assert rows_inserted == df_customers.shape[0]
+
+    return elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rows", type=int, nargs="+", default=[100_000, 1_000_000])
+    args = parser.parse_args()
+
+    tutorial.db._run_query(
+        f"create table if not exists {BENCHMARK_TABLE_NAME} (like customers including all)"
+    )
+
+    try:
+        for n_rows in args.rows:
+            df_customers = tutorial.cookbook1.clean_customer_data(
+                generate_raw_customer_data(n_rows)
+            )
+
+            baseline = timed_insert(
+                tutorial.db.insert_ignore_dataframe_to_postgres, df_customers
+            )
+            candidate = timed_insert(
+                tutorial.db.bulk_insert_ignore_dataframe_to_postgres, df_customers
+            )
+
+            print(
+                f"{'insert ignore dataframe':<40} rows={n_rows:>12,} "
+                f"to_sql={baseline:>9.3f}s copy={candidate:>9.3f}s "
+                f"speedup={baseline / candidate:>6.1f}x"
+            )
+    finally:
+        tutorial.db._run_query(f"drop table if exists {BENCHMARK_TABLE_NAME}")
+
+
+if __name__ == "__main__":
+    main()
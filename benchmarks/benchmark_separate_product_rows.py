@@ -0,0 +1,121 @@
+"""Benchmark cookbook2.separate_valid_and_invalid_product_rows against the original id round-trip.
+
+Uses a synthetic Validation Result with COMPLETE unexpected_index_list entries for two
+failed Expectations, with a share of failing rows.
+
+Run from the repository root inside the jupyterlab container:
+    python -m benchmarks.benchmark_separate_product_rows --rows 1000000 5000000
+"""
+
+import argparse
+from typing import Tuple
+
+import numpy as np
+import pandas as pd
+import tutorial_code as tutorial
+
+from benchmarks.synthetic_data import generate_raw_product_data
+from benchmarks.timing import best_of, print_result
+
+
+def separate_valid_and_invalid_product_rows_isin(
+    df_products: pd.DataFrame, validation_result: dict
+) -> Tuple[pd.DataFrame, pd.DataFrame]:
+    """Original implementation of cookbook2.separate_valid_and_invalid_product_rows."""
+    failing_expectations = []
+
+    for result in validation_result["results"]:
+        if result["success"] is False:
+            failing_expectations.append(result)
+
+    invalid_row_product_ids = []
+
+    for expectation in failing_expectations:
+        invalid_row_product_ids.extend(
+            [x["product_id"] for x in expectation["result"]["unexpected_index_list"]]
+        )
+
+    invalid_row_product_ids = list(set(invalid_row_product_ids))
+
+    df_products_invalid = df_products[
+        df_products["product_id"].isin(invalid_row_product_ids)
+    ].reset_index(drop=True)
+
+    df_products_valid = df_products.drop(
+        df_products[df_products["product_id"].isin(invalid_row_product_ids)].index
+    ).reset_index(drop=True)
+
+    return df_products_valid, df_products_invalid
+
+
+def generate_validation_result(
+    df_products: pd.DataFrame, failing_share: float, seed: int = 42
+) -> dict:
+    """Return a Validation Result-like dictionary with failed row-level Expectations."""
+    rng = np.random.default_rng(seed)
+    results = []
+
+    for kwargs in [
+        {"column": "unit_price_usd", "min_value": 1.0},
+        {"column_A": "unit_price_usd", "column_B": "unit_cost_usd"},
+    ]:
+        failing = rng.random(df_products.shape[0]) < failing_share / 2
+        results.append(
+            {
+                "success": False,
+                "expectation_config": {"type": "expectation", "kwargs": kwargs},
+                "result": {
+                    "unexpected_index_list": [
+                        {"product_id": x}
+                        for x in df_products["product_id"].to_numpy()[failing].tolist()
+                    ]
+                },
+            }
+        )
+
+    return {"results": results}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rows", type=int, nargs="+", default=[1_000_000, 5_000_000])
+    parser.add_argument("--failing-share", type=float, default=0.2)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    for n_rows in args.rows:
+        df_products, _, _ = tutorial.cookbook2.clean_product_data(
+            generate_raw_product_data(n_rows)
+        )
+        validation_result = generate_validation_result(df_products, args.failing_share)
+
+        # Check that both implementations produce the same result before timing.
+        for df_baseline, df_candidate in zip(
+            separate_valid_and_invalid_product_rows_isin(
+                df_products, validation_result
+            ),
+            tutorial.cookbook2.separate_valid_and_invalid_product_rows(
+                df_products, validation_result
+            ),
+        ):
+            pd.testing.assert_frame_equal(df_baseline, df_candidate)
+
+        baseline = best_of(
+            lambda: separate_valid_and_invalid_product_rows_isin(
+                df_products, validation_result
+            ),
+            args.repeat,
+        )
+        candidate = best_of(
+            lambda: tutorial.cookbook2.separate_valid_and_invalid_product_rows(
+                df_products, validation_result
+            ),
+            args.repeat,
+        )
+        print_result(
+            "separate_valid_and_invalid_product_rows", n_rows, baseline, candidate
+        )
+
+
+if __name__ == "__main__":
+    main()
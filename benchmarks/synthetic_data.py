@@ -0,0 +1,49 @@
+"""Synthetic raw data generators for tutorial code benchmarks."""
+
+import numpy as np
+import pandas as pd
+
+CUSTOMERS_CSV = "/cookbooks/data/raw/customers.csv"
+PRODUCTS_CSV = "/cookbooks/data/raw/products.csv"
+
+
+def generate_raw_customer_data(n_rows: int, seed: int = 42) -> pd.DataFrame:
+    """Return n_rows of synthetic raw customer data, resampled from the tutorial customers.csv.
+
+    Args:
+        n_rows: number of rows to generate
+        seed: random seed used to sample rows
+
+    Returns:
+        pandas dataframe with the same columns as the raw customer data
+    """
+    df_sample = pd.read_csv(CUSTOMERS_CSV, encoding="unicode_escape")
+
+    rng = np.random.default_rng(seed)
+    positions = rng.integers(0, df_sample.shape[0], size=n_rows)
+
+    df = df_sample.take(positions).reset_index(drop=True)
+    df["CustomerKey"] = np.arange(n_rows, dtype="int64")
+
+    return df
+
+
+def generate_raw_product_data(n_rows: int, seed: int = 42) -> pd.DataFrame:
+    """Return n_rows of synthetic raw product data, resampled from the tutorial products.csv.
+
+    Args:
+        n_rows: number of rows to generate
+        seed: random seed used to sample rows
+
+    Returns:
+        pandas dataframe with the same columns as the raw product data
+    """
+    df_sample = pd.read_csv(PRODUCTS_CSV, encoding="unicode_escape")
+
+    rng = np.random.default_rng(seed)
+    positions = rng.integers(0, df_sample.shape[0], size=n_rows)
+
+    df = df_sample.take(positions).reset_index(drop=True)
+    df["ProductKey"] = np.arange(n_rows, dtype="int64")
+
+    return df
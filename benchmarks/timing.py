@@ -0,0 +1,46 @@
+"""Timing helpers for tutorial code benchmarks."""
+
+import time
+import tracemalloc
+from typing import Callable
+
+
+def best_of(func: Callable, repeat: int = 3) -> float:
+    """Return the fastest wall-clock time in seconds of repeat calls to func."""
+    timings = []
+
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - start)
+
+    return min(timings)
+
+
+def peak_memory(func: Callable) -> float:
+    """Return the peak memory in MiB allocated by Python and numpy during a call to func."""
+    tracemalloc.start()
+
+    try:
+        func()
+        return tracemalloc.get_traced_memory()[1] / 1024**2
+    finally:
+        tracemalloc.stop()
+
+
+def print_result(label: str, n_rows: int, baseline: float, candidate: float) -> None:
+    """Print a single benchmark comparison line."""
+    print(
+        f"{label:<40} rows={n_rows:>12,} baseline={baseline:>9.3f}s "
+        f"candidate={candidate:>9.3f}s speedup={baseline / candidate:>6.1f}x"
+    )
+
+
+def print_memory_result(
+    label: str, n_rows: int, baseline: float, candidate: float
+) -> None:
+    """Print a single peak memory comparison line."""
+    print(
+        f"{label:<40} rows={n_rows:>12,} baseline={baseline:>8.1f}MiB "
+        f"candidate={candidate:>8.1f}MiB"
+    )
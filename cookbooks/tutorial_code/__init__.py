@@ -9,6 +9,7 @@ import tutorial_code.cookbook1 as cookbook1
 import tutorial_code.cookbook2 as cookbook2
 import tutorial_code.cookbook3 as cookbook3
 import tutorial_code.db as db
+import tutorial_code.incremental as incremental
 
 # Filter Deprecation/FutureWarnings, some older libraries are intentionally pinned for Airflow and Altair compatibility.
 warnings.filterwarnings("ignore", category=DeprecationWarning)
@@ -1,97 +1,468 @@
 """Helper functions for Cookbook 1 notebook and DAG."""
 
+import collections
+import concurrent.futures
+import logging
+import os
+import pathlib
+from typing import List, Optional, Tuple
+
 import great_expectations as gx
 import great_expectations.expectations as gxe
+import numpy as np
 import pandas as pd
+import tutorial_code as tutorial
 
+log = logging.getLogger("GX validation")
 
-def clean_customer_data(df_original: pd.DataFrame) -> pd.DataFrame:
-    """Clean sample customer data for Cookbook 1."""
-
-    # Generate a separate copy of original data to transform.
-    df = df_original.copy()
-
-    # Rename original columns.
-    RENAME_COLUMNS = {
-        "CustomerKey": "customer_id",
-        "Gender": "gender",
-        "Name": "name",
-        "City": "city",
-        "State Code": "state",
-        "Zip Code": "zip",
-        "Country": "country",
-        "Continent": "continent",
-        "Birthday": "dob",
-    }
+# Define short name types to keep function type hints cleaner.
+GxValidationResult = (
+    gx.core.expectation_validation_result.ExpectationSuiteValidationResult
+)
+GxExpectationResult = gx.core.expectation_validation_result.ExpectationValidationResult
+
+# Default number of raw customer rows read, validated and inserted per chunk.
+DEFAULT_CHUNKSIZE = 100_000
+
+# Map raw column names to cleaned column names.
+RENAME_COLUMNS = {
+    "CustomerKey": "customer_id",
+    "Gender": "gender",
+    "Name": "name",
+    "City": "city",
+    "State Code": "state",
+    "Zip Code": "zip",
+    "Country": "country",
+    "Continent": "continent",
+    "Birthday": "dob",
+}
+
+RETAIN_COLUMNS = ["customer_id", "name", "city", "state", "zip", "country"]
+
+# Column dtypes that read_csv cannot infer consistently across chunks, e.g. a chunk
+# containing only numeric zip codes would otherwise be read as integers.
+RAW_COLUMN_DTYPES = {"Zip Code": str}
+
+COUNTRY_NAME_TO_CODE = {
+    "Australia": "AU",
+    "Canada": "CA",
+    "Germany": "DE",
+    "France": "FR",
+    "Italy": "IT",
+    "Netherlands": "NL",
+    "United Kingdom": "GB",
+    "United States": "US",
+}
+
+
+def _title_case(series: pd.Series) -> pd.Series:
+    """Title case a string column, transforming each distinct value only once."""
+
+    # Customer columns like city repeat heavily, so factorize and title case the
+    # (much smaller) set of unique values before mapping them back onto each row.
+    codes, uniques = pd.factorize(series)
+    titled = np.asarray(pd.Index(uniques).str.title(), dtype=object)[codes]
+    titled[codes == -1] = np.nan
+
+    return pd.Series(titled, index=series.index, name=series.name)
 
-    df = df.rename(columns=RENAME_COLUMNS)
-
-    # Clean and standardize customer data.
-    COUNTRY_NAME_TO_CODE = {
-        "Australia": "AU",
-        "Canada": "CA",
-        "Germany": "DE",
-        "France": "FR",
-        "Italy": "IT",
-        "Netherlands": "NL",
-        "United Kingdom": "GB",
-        "United States": "US",
+
+def clean_customer_data_with_unmapped_rows(
+    df_original: pd.DataFrame,
+) -> Tuple[pd.DataFrame, pd.DataFrame]:
+    """Clean sample customer data for Cookbook 1, separating rows with an unmapped country.
+
+    Args:
+        df_original: pandas dataframe containing raw customer data
+
+    Returns:
+        Tuple of pandas dataframes:
+            Cleaned customer data rows
+            Customer data rows whose country is not found in COUNTRY_NAME_TO_CODE,
+            with the original country name retained
+    """
+
+    # Select and rename retained columns, this avoids copying the full original data.
+    columns = {
+        new_name: df_original[original_name]
+        for original_name, new_name in RENAME_COLUMNS.items()
+        if new_name in RETAIN_COLUMNS
     }
 
-    df["country"] = df["country"].apply(lambda x: COUNTRY_NAME_TO_CODE[x])
-    df["city"] = df["city"].apply(lambda x: x.title())
+    # Clean and standardize customer data using column-wide operations.
+    country_codes = columns["country"].map(COUNTRY_NAME_TO_CODE)
+    columns["city"] = _title_case(columns["city"])
+
+    df = pd.DataFrame({**columns, "country": country_codes}, columns=RETAIN_COLUMNS)
+
+    # Separate rows with a country that has no known country code.
+    unmapped = country_codes.isna().to_numpy()
+
+    if unmapped.any():
+        df_unmapped = df[unmapped].assign(
+            country=columns["country"].to_numpy()[unmapped]
+        )
+        df = df[~unmapped]
+    else:
+        df_unmapped = df.iloc[0:0]
+
+    return df, df_unmapped
+
+
+def clean_customer_data(df_original: pd.DataFrame) -> pd.DataFrame:
+    """Clean sample customer data for Cookbook 1.
+
+    Rows with a country that cannot be mapped to a country code are dropped and logged,
+    use clean_customer_data_with_unmapped_rows to retrieve them.
+    """
+
+    df, df_unmapped = clean_customer_data_with_unmapped_rows(df_original)
 
-    # Format final dataframe.
-    RETAIN_COLUMNS = ["customer_id", "name", "city", "state", "zip", "country"]
-    df = df[RETAIN_COLUMNS]
+    if df_unmapped.shape[0] > 0:
+        log.warning(
+            f"{df_unmapped.shape[0]} customer rows dropped with unmapped country: "
+            f"{sorted(df_unmapped['country'].astype(str).unique())}"
+        )
 
     return df
 
 
-def validate_customer_data(
-    df_customers: pd.DataFrame,
-) -> gx.core.expectation_validation_result.ExpectationSuiteValidationResult:
-    """Run GX data validation on sample customer data for Cookbook 1 and DAG, and return Validation Result."""
+def write_unmapped_rows_to_file(
+    filepath: pathlib.Path, df: pd.DataFrame, append: bool = False
+) -> None:
+    """Write customer rows with an unmapped country to an error file.
 
-    # Get GX context.
-    context = gx.get_context(mode="ephemeral")
+    Args:
+        filepath: full filepath to write file to
+        df: pandas dataframe containing unmapped rows
+        append: append rows to an existing file instead of overwriting it
+    """
 
-    # Create Data Source, Data Asset, Batch Definition, and get Batch.
-    data_source = context.data_sources.add_pandas("pandas")
-    data_asset = data_source.add_dataframe_asset(name="customer data")
-    batch_definition = data_asset.add_batch_definition_whole_dataframe(
-        "batch definition"
+    filepath = pathlib.Path(filepath)
+    filepath.parent.mkdir(parents=True, exist_ok=True)
+
+    df.to_csv(
+        filepath,
+        index=False,
+        mode="a" if append else "w",
+        header=not (append and filepath.exists()),
     )
-    batch = batch_definition.get_batch(batch_parameters={"dataframe": df_customers})
 
-    # Create Expectation Suite and add Expectations.
-    expectation_suite = context.suites.add(
-        gx.ExpectationSuite(name="customer expectations")
+    log.warning(
+        f"{df.shape[0]} customer rows with unmapped country written to error file "
+        f"{filepath}."
     )
 
-    expectations = [
-        gxe.ExpectTableColumnsToMatchOrderedList(
-            column_list=[
-                "customer_id",
-                "name",
-                "city",
-                "state",
-                "zip",
-                "country",
-            ]
-        ),
-        gxe.ExpectColumnValuesToBeOfType(column="customer_id", type_="int"),
-        *[
-            gxe.ExpectColumnValuesToBeOfType(column=x, type_="str")
-            for x in ["name", "city", "state", "zip"]
-        ],
-        gxe.ExpectColumnValuesToBeInSet(
-            column="country", value_set=["AU", "CA", "DE", "FR", "GB", "IT", "NL", "US"]
-        ),
+
+class CustomerDataValidator:
+    """Validate sample customer data against a GX Expectation Suite that is built once.
+
+    The GX context, Data Source, Data Asset, Batch Definition and Expectation Suite are
+    created when the validator is initialized, and reused for each validated dataframe.
+    """
+
+    def __init__(self):
+        # Get GX context.
+        self.context = gx.get_context(mode="ephemeral")
+
+        # Create Data Source, Data Asset, and Batch Definition.
+        data_source = self.context.data_sources.add_pandas("pandas")
+        data_asset = data_source.add_dataframe_asset(name="customer data")
+        self.batch_definition = data_asset.add_batch_definition_whole_dataframe(
+            "batch definition"
+        )
+
+        # Create Expectation Suite and add Expectations.
+        self.expectation_suite = self.context.suites.add(
+            gx.ExpectationSuite(name="customer expectations")
+        )
+
+        expectations = [
+            gxe.ExpectTableColumnsToMatchOrderedList(
+                column_list=[
+                    "customer_id",
+                    "name",
+                    "city",
+                    "state",
+                    "zip",
+                    "country",
+                ]
+            ),
+            gxe.ExpectColumnValuesToBeOfType(column="customer_id", type_="int"),
+            *[
+                gxe.ExpectColumnValuesToBeOfType(column=x, type_="str")
+                for x in ["name", "city", "state", "zip"]
+            ],
+            gxe.ExpectColumnValuesToBeInSet(
+                column="country",
+                value_set=["AU", "CA", "DE", "FR", "GB", "IT", "NL", "US"],
+            ),
+        ]
+
+        for expectation in expectations:
+            self.expectation_suite.add_expectation(expectation)
+
+    def validate(self, df_customers: pd.DataFrame) -> GxValidationResult:
+        """Validate a dataframe of cleaned customer data and return Validation Result."""
+
+        batch = self.batch_definition.get_batch(
+            batch_parameters={"dataframe": df_customers}
+        )
+
+        return batch.validate(self.expectation_suite)
+
+
+def validate_customer_data(df_customers: pd.DataFrame) -> GxValidationResult:
+    """Run GX data validation on sample customer data for Cookbook 1 and DAG, and return Validation Result.
+
+    Use a CustomerDataValidator directly to validate multiple dataframes without
+    rebuilding the GX context and Expectation Suite for each one.
+    """
+
+    return CustomerDataValidator().validate(df_customers)
+
+
+# Validator reused by all shards validated within a worker process, see
+# validate_customer_data_in_parallel.
+_shard_validator = None
+
+# Maximum number of values retained in merged partial unexpected lists, matches GX.
+PARTIAL_UNEXPECTED_LIST_SIZE = 20
+
+
+def _validate_customer_data_shard(df_shard: pd.DataFrame) -> GxValidationResult:
+    """Validate a shard of customer data in a worker process."""
+    global _shard_validator
+
+    if _shard_validator is None:
+        _shard_validator = CustomerDataValidator()
+
+    return _shard_validator.validate(df_shard)
+
+
+def _merge_expectation_results(
+    results: List[GxExpectationResult],
+) -> GxExpectationResult:
+    """Merge the results of a single Expectation validated against multiple shards."""
+
+    result = dict(results[0]["result"])
+
+    # Column map Expectations report element and unexpected counts that are summed
+    # across shards, aggregate Expectations report the observed value of the first
+    # failing shard. Which counts and lists are reported depends on the Expectation and
+    # result format, e.g. not_be_null reports no missing count, so only keys reported by
+    # the shards are merged.
+    if "element_count" in result:
+        reported_keys = set().union(*(x["result"].keys() for x in results))
+
+        element_count = sum(x["result"].get("element_count", 0) for x in results)
+        missing_count = sum(x["result"].get("missing_count", 0) for x in results)
+        unexpected_count = sum(x["result"].get("unexpected_count", 0) for x in results)
+        nonmissing_count = element_count - missing_count
+
+        unexpected_percent = (
+            unexpected_count / nonmissing_count * 100 if nonmissing_count else None
+        )
+
+        partial_unexpected_counts = collections.Counter()
+        for x in results:
+            for value_count in x["result"].get("partial_unexpected_counts", []):
+                partial_unexpected_counts[value_count["value"]] += value_count["count"]
+
+        merged_result = {
+            "element_count": element_count,
+            "unexpected_count": unexpected_count,
+            "unexpected_percent": unexpected_percent,
+            "missing_count": missing_count,
+            "missing_percent": (
+                missing_count / element_count * 100 if element_count else None
+            ),
+            "unexpected_percent_total": (
+                unexpected_count / element_count * 100 if element_count else None
+            ),
+            "unexpected_percent_nonmissing": unexpected_percent,
+            "partial_unexpected_list": [
+                value
+                for x in results
+                for value in x["result"].get("partial_unexpected_list", [])
+            ][:PARTIAL_UNEXPECTED_LIST_SIZE],
+            "partial_unexpected_index_list": [
+                index
+                for x in results
+                for index in x["result"].get("partial_unexpected_index_list", [])
+            ][:PARTIAL_UNEXPECTED_LIST_SIZE],
+            "partial_unexpected_counts": [
+                {"value": value, "count": count}
+                for value, count in partial_unexpected_counts.most_common(
+                    PARTIAL_UNEXPECTED_LIST_SIZE
+                )
+            ],
+        }
+
+        result.update({k: v for k, v in merged_result.items() if k in reported_keys})
+    else:
+        failed_results = [x for x in results if not x["success"]]
+        if failed_results:
+            result = dict(failed_results[0]["result"])
+
+    # Surface the first raised exception, if any shard raised one.
+    exception_info = results[0]["exception_info"]
+    for x in results:
+        if x["exception_info"] and x["exception_info"].get("raised_exception"):
+            exception_info = x["exception_info"]
+            break
+
+    return GxExpectationResult(
+        success=all(x["success"] for x in results),
+        expectation_config=results[0]["expectation_config"],
+        result=result,
+        meta=results[0]["meta"],
+        exception_info=exception_info,
+    )
+
+
+def _merge_validation_results(
+    validation_results: List[GxValidationResult],
+) -> GxValidationResult:
+    """Merge Validation Results of the same Expectation Suite validated against multiple shards."""
+
+    results = [
+        _merge_expectation_results(list(shard_results))
+        for shard_results in zip(*[x["results"] for x in validation_results])
     ]
 
-    for expectation in expectations:
-        expectation_suite.add_expectation(expectation)
+    successful_expectations = sum(1 for x in results if x["success"])
+
+    return GxValidationResult(
+        success=all(x["success"] for x in results),
+        results=results,
+        suite_name=validation_results[0]["suite_name"],
+        statistics={
+            "evaluated_expectations": len(results),
+            "successful_expectations": successful_expectations,
+            "unsuccessful_expectations": len(results) - successful_expectations,
+            "success_percent": (
+                successful_expectations / len(results) * 100 if results else None
+            ),
+        },
+        meta=validation_results[0]["meta"],
+        batch_id=validation_results[0]["batch_id"],
+    )
+
+
+def validate_customer_data_in_parallel(
+    df_customers: pd.DataFrame,
+    n_shards: Optional[int] = None,
+    max_workers: Optional[int] = None,
+) -> GxValidationResult:
+    """Run GX data validation on row shards of sample customer data across processes.
+
+    Args:
+        df_customers: pandas dataframe containing cleaned customer data
+        n_shards: number of row shards to split data into, defaults to max_workers
+        max_workers: number of worker processes, defaults to the number of CPUs
 
-    # Validate Batch using Expectation Suite and return result.
-    return batch.validate(expectation_suite)
+    Returns:
+        GX Validation Result object merged from the per-shard Validation Results
+    """
+
+    max_workers = max_workers or os.cpu_count() or 1
+    n_shards = max(1, min(n_shards or max_workers, df_customers.shape[0]))
+
+    # Split data into contiguous row shards, which keep the original index labels.
+    bounds = np.linspace(0, df_customers.shape[0], n_shards + 1).astype(int)
+    shards = [
+        df_customers.iloc[start:end] for start, end in zip(bounds[:-1], bounds[1:])
+    ]
+
+    with concurrent.futures.ProcessPoolExecutor(max_workers=max_workers) as executor:
+        validation_results = list(executor.map(_validate_customer_data_shard, shards))
+
+    return _merge_validation_results(validation_results)
+
+
+def validate_and_ingest_customer_data_in_chunks(
+    filepath: pathlib.Path,
+    chunksize: int = DEFAULT_CHUNKSIZE,
+    unmapped_rows_filepath: Optional[pathlib.Path] = None,
+) -> pd.DataFrame:
+    """Clean, validate and insert raw customer data into Postgres one chunk at a time.
+
+    Only a single chunk of the raw file is held in memory at once. Chunks are inserted
+    as soon as they are validated, in a single transaction that is only committed if
+    every chunk passes validation. If any chunk fails, no rows are inserted, as with
+    the non-chunked path, and the remaining chunks are validated but not inserted.
+
+    Args:
+        filepath: full filepath of the raw customer data csv
+        chunksize: number of raw rows to read per chunk
+        unmapped_rows_filepath: optional filepath that rows with an unmapped country,
+            which are not inserted, are written to across all chunks
+
+    Returns:
+        pandas dataframe with one row per chunk containing the chunk number, raw row
+        count, unmapped country row count, validation success and rows inserted, 0 for
+        every chunk if the transaction was rolled back
+    """
+
+    chunk_results = []
+    validator = CustomerDataValidator()
+    unmapped_rows_written = False
+
+    with tutorial.db.get_local_postgres_engine().connect() as connection:
+        transaction = connection.begin()
+
+        with pd.read_csv(
+            filepath,
+            encoding="unicode_escape",
+            dtype=RAW_COLUMN_DTYPES,
+            chunksize=chunksize,
+        ) as reader:
+            for chunk_number, df_raw in enumerate(reader):
+                df_customers, df_unmapped = clean_customer_data_with_unmapped_rows(
+                    df_raw
+                )
+
+                if unmapped_rows_filepath is not None and df_unmapped.shape[0] > 0:
+                    write_unmapped_rows_to_file(
+                        unmapped_rows_filepath,
+                        df_unmapped,
+                        append=unmapped_rows_written,
+                    )
+                    unmapped_rows_written = True
+
+                validation_result = validator.validate(df_customers)
+                all_chunks_valid = all(x["success"] for x in chunk_results)
+
+                rows_inserted = 0
+                if validation_result["success"] and all_chunks_valid:
+                    rows_inserted = (
+                        tutorial.db.bulk_insert_ignore_dataframes_to_postgres(
+                            {"customers": df_customers}, connection=connection
+                        )["customers"]
+                    )
+
+                chunk_result = {
+                    "chunk": chunk_number,
+                    "rows": df_raw.shape[0],
+                    "unmapped_rows": df_unmapped.shape[0],
+                    "success": validation_result["success"],
+                    "rows_inserted": rows_inserted,
+                }
+                chunk_results.append(chunk_result)
+
+                log.info(f"Customer data chunk processed: {chunk_result}")
+
+        # Insert all chunks or none.
+        if all(x["success"] for x in chunk_results):
+            transaction.commit()
+        else:
+            transaction.rollback()
+
+            for chunk_result in chunk_results:
+                chunk_result["rows_inserted"] = 0
+
+    return pd.DataFrame(
+        chunk_results,
+        columns=["chunk", "rows", "unmapped_rows", "success", "rows_inserted"],
+    )
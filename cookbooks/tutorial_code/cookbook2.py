@@ -1,12 +1,19 @@
 """Helper functions for Cookbook 2 notebook and DAG."""
 
+import concurrent.futures
+import json
 import logging
+import multiprocessing
 import pathlib
-from typing import Tuple
+import time
+from typing import Dict, Optional, Tuple, Union
 
 import great_expectations as gx
 import great_expectations.expectations as gxe
+import numpy as np
 import pandas as pd
+import sqlalchemy
+import tutorial_code as tutorial
 
 log = logging.getLogger("GX validation")
 
@@ -17,6 +24,7 @@ GxDataContext = gx.data_context.data_context.ephemeral_data_context.EphemeralDat
 GxValidationResult = (
     gx.core.expectation_validation_result.ExpectationSuiteValidationResult
 )
+GxCheckpoint = gx.checkpoint.checkpoint.Checkpoint
 GxCheckpointResult = gx.checkpoint.checkpoint.CheckpointResult
 
 
@@ -30,86 +38,370 @@ def _extract_validation_result_from_checkpoint_result(
     return validation_result
 
 
-def clean_product_data(
+def _expectation_key(expectation_config) -> Tuple[str, str]:
+    """Return the type and serialized kwargs of an Expectation configuration.
+
+    The key identifies an Expectation across validation runs, batch_id and result_format
+    kwargs, which can differ between runs, are excluded.
+    """
+
+    kwargs = {
+        k: v
+        for k, v in expectation_config["kwargs"].items()
+        if k not in ["batch_id", "result_format"]
+    }
+
+    return expectation_config["type"], json.dumps(kwargs, sort_keys=True, default=str)
+
+
+# Result format of the first, cheap validation pass in two-phase validation.
+TWO_PHASE_FIRST_PASS_RESULT_FORMAT = "BOOLEAN_ONLY"
+
+
+def _run_checkpoint(
+    checkpoint: GxCheckpoint, df: pd.DataFrame, two_phase: bool = False
+) -> GxValidationResult:
+    """Run a Checkpoint on a pandas dataframe and return its Validation Result.
+
+    Args:
+        checkpoint: GX Checkpoint with a single Validation Definition
+        df: pandas dataframe to validate
+        two_phase: validate with TWO_PHASE_FIRST_PASS_RESULT_FORMAT first, and re-run
+            only failed Expectations with the Checkpoint result format. The Validation
+            Definition is run directly, Checkpoint actions are not run
+
+    Returns:
+        GX Validation Result object containing result metadata
+    """
+
+    if not two_phase:
+        checkpoint_result = checkpoint.run(batch_parameters={"dataframe": df})
+        return _extract_validation_result_from_checkpoint_result(checkpoint_result)
+
+    validation_definition = checkpoint.validation_definitions[0]
+
+    # Cheap first pass, sufficient when all Expectations succeed.
+    validation_result = validation_definition.run(
+        batch_parameters={"dataframe": df},
+        result_format=TWO_PHASE_FIRST_PASS_RESULT_FORMAT,
+    )
+
+    failed_indexes = [
+        i for i, x in enumerate(validation_result.results) if not x.success
+    ]
+
+    if not failed_indexes:
+        return validation_result
+
+    # Re-run failed Expectations only, collecting Checkpoint result format detail.
+    failed_expectations = []
+
+    for i in failed_indexes:
+        expectation = validation_result.results[i].expectation_config.to_domain_obj()
+        expectation.id = None
+        failed_expectations.append(expectation)
+
+    failed_suite = gx.ExpectationSuite(
+        name=f"{validation_definition.suite.name} failed expectations",
+        expectations=failed_expectations,
+    )
+
+    batch = validation_definition.batch_definition.get_batch(
+        batch_parameters={"dataframe": df}
+    )
+    failed_validation_result = batch.validate(
+        failed_suite, result_format=checkpoint.result_format
+    )
+
+    # Replace first pass results of failed Expectations with the detailed results,
+    # matched by Expectation type and kwargs, as re-run Expectations have no id.
+    failed_results = {
+        _expectation_key(x.expectation_config): x
+        for x in failed_validation_result.results
+    }
+
+    for i in failed_indexes:
+        expectation_config = validation_result.results[i].expectation_config
+        key = _expectation_key(expectation_config)
+
+        if key not in failed_results:
+            raise Exception(
+                f"Re-run of failed Expectation {_expectation_label(expectation_config)} "
+                "returned no result."
+            )
+
+        failed_result = failed_results[key]
+        failed_result.expectation_config.id = expectation_config.id
+        validation_result.results[i] = failed_result
+
+    return validation_result
+
+
+# Original product data column names mapped to cleaned column names.
+RENAME_COLUMNS = {
+    "ProductKey": "product_id",
+    "Product Name": "name",
+    "Brand": "brand",
+    "Color": "color",
+    "Unit Cost USD": "unit_cost_usd",
+    "Unit Price USD": "unit_price_usd",
+    "SubcategoryKey": "product_subcategory_id",
+    "Subcategory": "product_subcategory_name",
+    "CategoryKey": "product_category_id",
+    "Category": "product_category_name",
+}
+
+PRODUCT_RETAIN_COLUMNS = [
+    "product_id",
+    "name",
+    "brand",
+    "color",
+    "unit_cost_usd",
+    "unit_price_usd",
+    "product_category_id",
+    "product_subcategory_id",
+]
+
+CURRENCY_COLUMNS = ["unit_cost_usd", "unit_price_usd"]
+
+# Characters stripped from currency figures before conversion: whitespace, thousands
+# separators and currency symbols.
+CURRENCY_STRIP_PATTERN = r"[\s,$€£¥]"
+
+# Column added to invalid product rows, listing the Expectations each row failed.
+REASON_COLUMN = "failed_expectations"
+REASON_SEPARATOR = "; "
+
+# Reason listed for product rows with a cost or price figure that cannot be parsed.
+MALFORMED_CURRENCY_REASON = "malformed currency"
+
+# Postgres table invalid product rows are quarantined in, see write_invalid_rows_to_postgres.
+QUARANTINE_TABLE_NAME = "products_quarantine"
+
+# Product foreign key columns and the dimension tables they reference.
+PRODUCT_FOREIGN_KEYS = {
+    "product_category_id": "product_category",
+    "product_subcategory_id": "product_subcategory",
+}
+
+
+def _parse_currency(series: pd.Series) -> pd.Series:
+    """Convert currency figures such as "$1,299.00 " to float, malformed figures become NaN.
+
+    Product data repeats a small number of distinct figures, so each distinct figure is
+    parsed once and the result is mapped back to all rows.
+    """
+
+    if pd.api.types.is_numeric_dtype(series):
+        return series.astype("float64")
+
+    codes, uniques = pd.factorize(series)
+
+    parsed_uniques = pd.to_numeric(
+        pd.Series(uniques, dtype=object)
+        .astype(str)
+        .str.replace(CURRENCY_STRIP_PATTERN, "", regex=True),
+        errors="coerce",
+    ).to_numpy(dtype="float64")
+
+    # Null figures have code -1 and are treated as malformed.
+    parsed = np.append(parsed_uniques, np.nan)[codes]
+
+    return pd.Series(parsed, index=series.index, name=series.name)
+
+
+def _extract_dimension(
+    ids: pd.Series, names: pd.Series, id_column: str
+) -> Tuple[pd.DataFrame, np.ndarray]:
+    """Return unique id/name pairs in order of first appearance, and each row's pair position.
+
+    Each id normally has a single name, in which case pairs are found by factorizing the
+    ids alone, without hashing names or copying the id and name columns into a new frame.
+
+    Args:
+        ids: dimension ids of each row
+        names: dimension names of each row
+        id_column: name of the id column in the returned dataframe
+
+    Returns:
+        Tuple of:
+            pandas dataframe of unique pairs, with columns id_column and name
+            numpy array of int32 positions of each row's pair in the dataframe
+    """
+
+    id_codes, _ = pd.factorize(ids, use_na_sentinel=False)
+    first_positions = _first_positions(id_codes)
+
+    name_values = names.to_numpy()
+    row_first_names = name_values[first_positions][id_codes]
+
+    consistent = (name_values == row_first_names) | (
+        pd.isna(name_values) & pd.isna(row_first_names)
+    )
+
+    # Fall back to grouping on both columns if any id has more than one name.
+    if not consistent.all():
+        id_codes = (
+            pd.DataFrame({"id": ids, "name": names})
+            .groupby(["id", "name"], sort=False, dropna=False)
+            .ngroup()
+            .to_numpy()
+        )
+        first_positions = _first_positions(id_codes)
+
+    df_dimension = pd.DataFrame(
+        {
+            id_column: ids.to_numpy()[first_positions],
+            "name": name_values[first_positions],
+        }
+    )
+
+    return df_dimension, id_codes.astype("int32")
+
+
+def _first_positions(codes: np.ndarray) -> np.ndarray:
+    """Return the position of the first occurrence of each code, given codes 0 to n - 1.
+
+    Codes from factorize or ngroup include every value from 0 to n - 1, so the sorted
+    unique codes returned by np.unique are exactly 0 to n - 1.
+    """
+
+    return np.unique(codes, return_index=True)[1]
+
+
+def clean_product_data_with_malformed_rows(
     df_original: pd.DataFrame,
-) -> Tuple[pd.DataFrame, pd.DataFrame, pd.DataFrame]:
-    """Clean sample product data for Cookbook 2.
+    dimension_keys: bool = False,
+) -> Tuple[pd.DataFrame, pd.DataFrame, pd.DataFrame, pd.DataFrame]:
+    """Clean sample product data for Cookbook 2, separating rows with malformed currency figures.
+
+    Product categories and subcategories are extracted from the kept rows only.
+
+    Args:
+        df_original: pandas dataframe containing raw product data
+        dimension_keys: add integer-coded dimension keys, product_category_key and
+            product_subcategory_key, to the product data and as the first column of the
+            product category and subcategory dataframes. Keys are row positions in the
+            dimension dataframes. Note that the added columns are not part of the
+            product table schema or the product Expectations, and are not added to
+            malformed rows
 
     Returns:
-        Tuple of pandas dataframes: product data, product categories, product subcategories
+        Tuple of pandas dataframes:
+            Cleaned product data rows
+            Product categories
+            Product subcategories
+            Product data rows with a cost or price that cannot be parsed, with the
+            original cost and price figures retained
     """
 
-    # Generate a separate copy of original data to transform.
-    df_products = df_original.copy()
-
-    # Rename original columns.
-    RENAME_COLUMNS = {
-        "ProductKey": "product_id",
-        "Product Name": "name",
-        "Brand": "brand",
-        "Color": "color",
-        "Unit Cost USD": "unit_cost_usd",
-        "Unit Price USD": "unit_price_usd",
-        "SubcategoryKey": "product_subcategory_id",
-        "Subcategory": "product_subcategory_name",
-        "CategoryKey": "product_category_id",
-        "Category": "product_category_name",
+    # Select and rename columns, this avoids copying the full original data.
+    columns = {
+        new_name: df_original[original_name]
+        for original_name, new_name in RENAME_COLUMNS.items()
     }
 
-    df_products = df_products.rename(columns=RENAME_COLUMNS)
+    # Clean cost and price figures using column-wide operations.
+    currency_values = {x: _parse_currency(columns[x]) for x in CURRENCY_COLUMNS}
+
+    # Separate rows with a cost or price figure that could not be parsed, retaining their
+    # original figures. Products and dimensions are built from the kept rows only.
+    malformed = np.logical_or.reduce(
+        [x.isna().to_numpy() for x in currency_values.values()]
+    )
+    has_malformed = malformed.any()
 
-    # Clean cost and price figures.
-    for currency_col in ["unit_cost_usd", "unit_price_usd"]:
-        df_products[currency_col] = df_products[currency_col].apply(
-            lambda x: float(x.replace("$", "").replace(",", "").strip())
+    if has_malformed:
+        df_malformed = pd.DataFrame(
+            {x: columns[x][malformed] for x in PRODUCT_RETAIN_COLUMNS}
         )
 
-    # Generate product category and subcategory dataframes.
-    df_product_categories = (
-        df_products[["product_category_id", "product_category_name"]]
-        .copy()
-        .drop_duplicates()
-        .reset_index(drop=True)
-        .rename(columns={"product_category_name": "name"})
+    columns.update(currency_values)
+
+    if has_malformed:
+        columns = {name: values[~malformed] for name, values in columns.items()}
+
+    # Build the product dataframe from the retained columns only. A dictionary with extra
+    # columns filtered by the columns argument is much slower to construct.
+    df_products = pd.DataFrame({x: columns[x] for x in PRODUCT_RETAIN_COLUMNS})
+
+    if not has_malformed:
+        df_malformed = df_products.iloc[0:0]
+
+    # Generate product category and subcategory dataframes from unique key/name pairs.
+    df_product_categories, category_keys = _extract_dimension(
+        columns["product_category_id"],
+        columns["product_category_name"],
+        id_column="product_category_id",
     )
 
-    df_product_subcategories = (
-        df_products[["product_subcategory_id", "product_subcategory_name"]]
-        .copy()
-        .drop_duplicates()
-        .reset_index(drop=True)
-        .rename(columns={"product_subcategory_name": "name"})
+    df_product_subcategories, subcategory_keys = _extract_dimension(
+        columns["product_subcategory_id"],
+        columns["product_subcategory_name"],
+        id_column="product_subcategory_id",
     )
 
-    # Format final product dataframe.
-    PRODUCT_RETAIN_COLUMNS = [
-        "product_id",
-        "name",
-        "brand",
-        "color",
-        "unit_cost_usd",
-        "unit_price_usd",
-        "product_category_id",
-        "product_subcategory_id",
-    ]
+    if dimension_keys:
+        df_products["product_category_key"] = category_keys
+        df_products["product_subcategory_key"] = subcategory_keys
+        df_product_categories.insert(
+            0,
+            "product_category_key",
+            np.arange(len(df_product_categories), dtype="int32"),
+        )
+        df_product_subcategories.insert(
+            0,
+            "product_subcategory_key",
+            np.arange(len(df_product_subcategories), dtype="int32"),
+        )
+
+    return df_products, df_product_categories, df_product_subcategories, df_malformed
 
-    df_products = df_products[PRODUCT_RETAIN_COLUMNS]
+
+def clean_product_data(
+    df_original: pd.DataFrame,
+    dimension_keys: bool = False,
+) -> Tuple[pd.DataFrame, pd.DataFrame, pd.DataFrame]:
+    """Clean sample product data for Cookbook 2.
+
+    Rows with a cost or price figure that cannot be parsed are dropped and logged, use
+    clean_product_data_with_malformed_rows to retrieve them.
+
+    Args:
+        df_original: pandas dataframe containing raw product data
+        dimension_keys: add integer-coded dimension keys, see
+            clean_product_data_with_malformed_rows
+
+    Returns:
+        Tuple of pandas dataframes: product data, product categories, product subcategories
+    """
+
+    df_products, df_product_categories, df_product_subcategories, df_malformed = (
+        clean_product_data_with_malformed_rows(df_original, dimension_keys)
+    )
+
+    if df_malformed.shape[0] > 0:
+        log.warning(
+            f"{df_malformed.shape[0]} product rows dropped with malformed cost or price."
+        )
 
     return df_products, df_product_categories, df_product_subcategories
 
 
-def _validate_products(context: GxDataContext, df: pd.DataFrame) -> GxValidationResult:
-    """Validate sample product data.
+def _add_products_checkpoint(
+    context: GxDataContext, data_source_name: str = DATA_SOURCE_NAME
+) -> GxCheckpoint:
+    """Add the Checkpoint that validates sample product data.
 
     Args:
         context: GX Data Context
-        df: pandas dataframe containing product data
+        data_source_name: name of the pandas Data Source to add the Data Asset to
 
     Returns:
-        GX Validation Result object containing result metadata
+        GX Checkpoint, run with a pandas dataframe batch parameter
     """
 
-    data_source = context.data_sources.get(DATA_SOURCE_NAME)
+    data_source = context.data_sources.get(data_source_name)
 
     data_asset = data_source.add_dataframe_asset(name="products")
     batch_definition = data_asset.add_batch_definition_whole_dataframe(
@@ -150,7 +442,7 @@ def _validate_products(context: GxDataContext, df: pd.DataFrame) -> GxValidation
         )
     )
 
-    checkpoint = context.checkpoints.add(
+    return context.checkpoints.add(
         gx.Checkpoint(
             name="products checkpoint",
             validation_definitions=[validation_definition],
@@ -161,25 +453,37 @@ def _validate_products(context: GxDataContext, df: pd.DataFrame) -> GxValidation
         )
     )
 
-    checkpoint_result = checkpoint.run(batch_parameters={"dataframe": df})
 
-    return _extract_validation_result_from_checkpoint_result(checkpoint_result)
-
-
-def _validate_product_categories(
-    context: GxDataContext, df: pd.DataFrame
+def _validate_products(
+    context: GxDataContext, df: pd.DataFrame, two_phase: bool = False
 ) -> GxValidationResult:
-    """Validate sample product category data.
+    """Validate sample product data.
 
     Args:
         context: GX Data Context
-        df: pandas dataframe containing product category data
+        df: pandas dataframe containing product data
+        two_phase: see _run_checkpoint
 
     Returns:
         GX Validation Result object containing result metadata
     """
+    return _run_checkpoint(_add_products_checkpoint(context), df, two_phase)
+
+
+def _add_product_categories_checkpoint(
+    context: GxDataContext, data_source_name: str = DATA_SOURCE_NAME
+) -> GxCheckpoint:
+    """Add the Checkpoint that validates sample product category data.
+
+    Args:
+        context: GX Data Context
+        data_source_name: name of the pandas Data Source to add the Data Asset to
+
+    Returns:
+        GX Checkpoint, run with a pandas dataframe batch parameter
+    """
 
-    data_source = context.data_sources.get(DATA_SOURCE_NAME)
+    data_source = context.data_sources.get(data_source_name)
 
     data_asset = data_source.add_dataframe_asset(name="product categories")
     batch_definition = data_asset.add_batch_definition_whole_dataframe(
@@ -207,7 +511,7 @@ def _validate_product_categories(
         )
     )
 
-    checkpoint = context.checkpoints.add(
+    return context.checkpoints.add(
         gx.Checkpoint(
             name="product category checkpoint",
             validation_definitions=[validation_definition],
@@ -218,25 +522,37 @@ def _validate_product_categories(
         )
     )
 
-    checkpoint_result = checkpoint.run(batch_parameters={"dataframe": df})
-
-    return _extract_validation_result_from_checkpoint_result(checkpoint_result)
 
-
-def _validate_product_subcategories(
-    context: GxDataContext, df: pd.DataFrame
+def _validate_product_categories(
+    context: GxDataContext, df: pd.DataFrame, two_phase: bool = False
 ) -> GxValidationResult:
-    """Validate sample product subcategory data.
+    """Validate sample product category data.
 
     Args:
         context: GX Data Context
-        df: pandas dataframe containing product subcategory data
+        df: pandas dataframe containing product category data
+        two_phase: see _run_checkpoint
 
     Returns:
         GX Validation Result object containing result metadata
     """
+    return _run_checkpoint(_add_product_categories_checkpoint(context), df, two_phase)
 
-    data_source = context.data_sources.get(DATA_SOURCE_NAME)
+
+def _add_product_subcategories_checkpoint(
+    context: GxDataContext, data_source_name: str = DATA_SOURCE_NAME
+) -> GxCheckpoint:
+    """Add the Checkpoint that validates sample product subcategory data.
+
+    Args:
+        context: GX Data Context
+        data_source_name: name of the pandas Data Source to add the Data Asset to
+
+    Returns:
+        GX Checkpoint, run with a pandas dataframe batch parameter
+    """
+
+    data_source = context.data_sources.get(data_source_name)
 
     data_asset = data_source.add_dataframe_asset(name="product subcategories")
     batch_definition = data_asset.add_batch_definition_whole_dataframe(
@@ -264,7 +580,7 @@ def _validate_product_subcategories(
         )
     )
 
-    checkpoint = context.checkpoints.add(
+    return context.checkpoints.add(
         gx.Checkpoint(
             name="product subcategory checkpoint",
             validation_definitions=[validation_definition],
@@ -275,15 +591,159 @@ def _validate_product_subcategories(
         )
     )
 
-    checkpoint_result = checkpoint.run(batch_parameters={"dataframe": df})
 
-    return _extract_validation_result_from_checkpoint_result(checkpoint_result)
+def _validate_product_subcategories(
+    context: GxDataContext, df: pd.DataFrame, two_phase: bool = False
+) -> GxValidationResult:
+    """Validate sample product subcategory data.
+
+    Args:
+        context: GX Data Context
+        df: pandas dataframe containing product subcategory data
+        two_phase: see _run_checkpoint
+
+    Returns:
+        GX Validation Result object containing result metadata
+    """
+    return _run_checkpoint(
+        _add_product_subcategories_checkpoint(context), df, two_phase
+    )
+
+
+# Functions adding the Checkpoint for each product table, in validate_product_data
+# result order.
+_PRODUCT_TABLE_CHECKPOINTS = {
+    "products": _add_products_checkpoint,
+    "product categories": _add_product_categories_checkpoint,
+    "product subcategories": _add_product_subcategories_checkpoint,
+}
+
+
+def _validate_product_table_in_process(
+    table: str, df: pd.DataFrame, two_phase: bool = False
+) -> GxValidationResult:
+    """Validate a single product table in a worker process, with the process' own GX context.
+
+    Args:
+        table: product table name, a key of _PRODUCT_TABLE_CHECKPOINTS
+        df: pandas dataframe containing the table data
+        two_phase: see _run_checkpoint
+
+    Returns:
+        GX Validation Result object containing result metadata
+    """
+
+    context = gx.get_context(mode="ephemeral")
+    context.data_sources.add_pandas(DATA_SOURCE_NAME)
+
+    return _run_checkpoint(_PRODUCT_TABLE_CHECKPOINTS[table](context), df, two_phase)
+
+
+def _validate_product_tables_concurrently(
+    dataframes: Dict[str, pd.DataFrame],
+    max_workers: Optional[int] = None,
+    timeout: Optional[float] = None,
+    use_processes: bool = False,
+    two_phase: bool = False,
+) -> Tuple[GxValidationResult, ...]:
+    """Validate product tables concurrently, one validation per table.
+
+    With threads, Checkpoints are added to a single GX context up front and only
+    Checkpoint runs are concurrent, as GX resolves Data Assets through the most recently
+    created context. Each table gets its own Data Source, and so its own execution engine
+    holding the active batch. With processes, each table is validated with its own GX
+    context, in a multiprocessing pool.
+
+    Every table validation runs to completion, or until the timeout, regardless of errors
+    in the other table validations. Errors are raised once all validations are finished.
+
+    With processes, the pool is terminated once results are collected, which stops any
+    validations that timed out. Daemonic processes, such as Airflow LocalExecutor task
+    processes, cannot start worker processes, so threads are used there instead. Threads
+    cannot be stopped, so with threads a timed out validation keeps running in the
+    background, and the interpreter waits for it to finish before exiting. The timeout
+    then bounds how long this function waits, but not the wall time of e.g. an Airflow
+    task, use the task execution_timeout for that.
+    """
+
+    if use_processes and multiprocessing.current_process().daemon:
+        log.warning(
+            "Daemonic processes cannot start worker processes, validating product "
+            "tables in threads instead."
+        )
+        use_processes = False
+
+    n_workers = max_workers or len(dataframes)
+    validation_results = {}
+    errors = {}
+
+    # Start validating each table.
+    if use_processes:
+        pool = multiprocessing.Pool(processes=n_workers)
+        pending = {
+            table: pool.apply_async(
+                _validate_product_table_in_process, (table, df, two_phase)
+            )
+            for table, df in dataframes.items()
+        }
+    else:
+        context = gx.get_context(mode="ephemeral")
+        executor = concurrent.futures.ThreadPoolExecutor(max_workers=n_workers)
+        pending = {}
+
+        for table, df in dataframes.items():
+            data_source = context.data_sources.add_pandas(f"{DATA_SOURCE_NAME} {table}")
+            checkpoint = _PRODUCT_TABLE_CHECKPOINTS[table](context, data_source.name)
+            pending[table] = executor.submit(_run_checkpoint, checkpoint, df, two_phase)
+
+    deadline = None if timeout is None else time.monotonic() + timeout
+
+    try:
+        for table, result in pending.items():
+            remaining = (
+                None if deadline is None else max(deadline - time.monotonic(), 0)
+            )
+            try:
+                if use_processes:
+                    validation_results[table] = result.get(timeout=remaining)
+                else:
+                    validation_results[table] = result.result(timeout=remaining)
+            except (concurrent.futures.TimeoutError, multiprocessing.TimeoutError):
+                errors[table] = f"timed out after {timeout} seconds"
+            except Exception as e:
+                errors[table] = repr(e)
+
+    finally:
+        if use_processes:
+            # Stop worker processes, including any still running timed out validations.
+            pool.terminate()
+            pool.join()
+        else:
+            # Do not wait on validations that timed out, or were interrupted, e.g. by an
+            # Airflow task timeout.
+            executor.shutdown(wait=False, cancel_futures=True)
+
+    for table, error in errors.items():
+        log.error(f"GX data validation for {table} did not complete: {error}")
+
+    if errors:
+        raise Exception(
+            f"GX data validation did not complete for: {', '.join(errors)}. "
+            f"Completed validations: {', '.join(validation_results) or 'none'}."
+        )
+
+    return tuple(validation_results[table] for table in dataframes)
 
 
 def validate_product_data(
     df_products: pd.DataFrame,
     df_product_categories: pd.DataFrame,
     df_product_subcategories: pd.DataFrame,
+    concurrent_validation: bool = False,
+    max_workers: Optional[int] = None,
+    timeout: Optional[float] = None,
+    use_processes: bool = False,
+    two_phase: bool = False,
 ) -> Tuple[GxValidationResult, GxValidationResult, GxValidationResult]:
     """Run GX data validation on sample product data for Cookbook 2 and DAG, and return Validation Results.
 
@@ -291,14 +751,41 @@ def validate_product_data(
         df_products: pandas dataframe containing product data
         df_product_categories: pandas dataframe containing product category data
         df_product_subcategories: pandas dataframe containing product subcategory data
+        concurrent_validation: validate the three tables concurrently instead of one
+            after another
+        max_workers: maximum number of concurrent validations, defaults to one per table
+        timeout: optional seconds to wait for concurrent validations to complete, a timed
+            out validation is only stopped when use_processes is True
+        use_processes: run concurrent validations in worker processes instead of threads,
+            falls back to threads in a daemonic process
+        two_phase: validate with a cheap result format first, and collect COMPLETE
+            results, including unexpected row ids, only for failed Expectations
 
     Returns:
         Tuple of Validation Results for:
             * product validation
             * product category validation
             * product subcategory
+
+    Raises:
+        Exception: in concurrent mode, if any table validation raised an error or timed
+            out. The other table validations are not interrupted, and errors are logged
+            per table.
     """
 
+    if concurrent_validation:
+        return _validate_product_tables_concurrently(
+            {
+                "products": df_products,
+                "product categories": df_product_categories,
+                "product subcategories": df_product_subcategories,
+            },
+            max_workers=max_workers,
+            timeout=timeout,
+            use_processes=use_processes,
+            two_phase=two_phase,
+        )
+
     # Get GX context.
     context = gx.get_context(mode="ephemeral")
 
@@ -307,20 +794,236 @@ def validate_product_data(
 
     # Validate product, product category, and product subcategory data, return results.
     return (
-        _validate_products(context, df_products),
-        _validate_product_categories(context, df_product_categories),
-        _validate_product_subcategories(context, df_product_subcategories),
+        _validate_products(context, df_products, two_phase),
+        _validate_product_categories(context, df_product_categories, two_phase),
+        _validate_product_subcategories(context, df_product_subcategories, two_phase),
     )
 
 
+def _expectation_label(expectation_config: dict) -> str:
+    """Return a short label for an Expectation, e.g. expect_column_values_to_be_between(unit_price_usd)."""
+
+    columns = [
+        expectation_config["kwargs"][x]
+        for x in ["column", "column_A", "column_B"]
+        if x in expectation_config["kwargs"]
+    ]
+
+    return f"{expectation_config['type']}({', '.join(columns)})"
+
+
+def _unexpected_row_positions(
+    df_products: pd.DataFrame, unexpected_index_list: list, product_id_index: pd.Index
+) -> np.ndarray:
+    """Return row positions of unexpected rows, given an Expectation unexpected_index_list.
+
+    Entries are dictionaries of product ids when the result format includes
+    unexpected_index_column_names, and dataframe index labels otherwise.
+
+    Raises:
+        Exception: if an entry does not match any product row, e.g. the Validation
+            Result was produced for a different dataframe
+    """
+
+    if not unexpected_index_list:
+        return np.array([], dtype="int64")
+
+    if isinstance(unexpected_index_list[0], dict):
+        product_ids = [x["product_id"] for x in unexpected_index_list]
+
+        # Convert ids to the id column dtype once, instead of per lookup.
+        if product_id_index.dtype.kind in "iuf":
+            product_ids = np.array(product_ids, dtype=product_id_index.dtype)
+
+        # Product ids are unique, so each id resolves to a single row position.
+        if product_id_index.is_unique:
+            positions = product_id_index.get_indexer(product_ids)
+            n_unmatched = (positions < 0).sum()
+        else:
+            positions = np.flatnonzero(
+                df_products["product_id"].isin(product_ids).to_numpy()
+            )
+            n_unmatched = (~pd.Index(product_ids).isin(product_id_index)).sum()
+    else:
+        positions = df_products.index.get_indexer(unexpected_index_list)
+        n_unmatched = (positions < 0).sum()
+
+    # get_indexer returns -1 for entries it cannot find, which would otherwise mark the
+    # last row invalid.
+    if n_unmatched > 0:
+        raise Exception(
+            f"{n_unmatched} unexpected rows in the Validation Result do not match any "
+            "product row."
+        )
+
+    return positions
+
+
+def get_product_validity_mask(
+    df_products: pd.DataFrame,
+    validation_result: GxValidationResult,
+    by_expectation: bool = False,
+) -> Union[np.ndarray, Tuple[np.ndarray, pd.DataFrame]]:
+    """Return a boolean mask of valid product rows based on validation results.
+
+    Args:
+        df_products: pandas dataframe containing product data
+        validation_result: GX Validation Result object (requires COMPLETE results format
+            for failed Expectations)
+        by_expectation: also return the validity of each row for each Expectation
+
+    Returns:
+        numpy boolean array aligned to df_products rows, True for rows that pass all
+        Expectations. If by_expectation is True, a tuple of the array and a pandas
+        dataframe aligned to df_products, with one boolean column per Expectation
+
+    Raises:
+        Exception: if a failed Expectation result has no unexpected_index_list, e.g. a
+            table-level Expectation, so that its failure cannot be attributed to rows
+    """
+
+    valid = np.ones(df_products.shape[0], dtype=bool)
+    expectation_valid = {}
+    product_id_index = pd.Index(df_products["product_id"])
+
+    for result in validation_result["results"]:
+        label = _expectation_label(result["expectation_config"])
+
+        if result["success"] is not False:
+            if by_expectation:
+                expectation_valid[label] = np.ones(df_products.shape[0], dtype=bool)
+            continue
+
+        if "unexpected_index_list" not in result["result"]:
+            raise Exception(
+                f"Failed Expectation {label} has no unexpected_index_list, its failure "
+                "cannot be attributed to product rows."
+            )
+
+        positions = _unexpected_row_positions(
+            df_products, result["result"]["unexpected_index_list"], product_id_index
+        )
+        valid[positions] = False
+
+        if by_expectation:
+            expectation_valid[label] = np.ones(df_products.shape[0], dtype=bool)
+            expectation_valid[label][positions] = False
+
+    if by_expectation:
+        return valid, pd.DataFrame(expectation_valid, index=df_products.index)
+
+    return valid
+
+
+def get_invalid_row_reasons(df_expectation_valid: pd.DataFrame) -> pd.Series:
+    """Return the sorted labels of the Expectations each row failed, separated by REASON_SEPARATOR.
+
+    Labels are joined once per distinct combination of failed Expectations, rather than
+    once per row.
+
+    Args:
+        df_expectation_valid: pandas dataframe with one boolean validity column per
+            Expectation, as returned by get_product_validity_mask
+
+    Returns:
+        pandas series of failed Expectation labels, empty for valid rows
+    """
+
+    # Sort labels, GX does not guarantee the order of Expectation results.
+    df_expectation_valid = df_expectation_valid[sorted(df_expectation_valid.columns)]
+
+    labels = np.array(df_expectation_valid.columns, dtype=object)
+    failed = ~df_expectation_valid.to_numpy(dtype=bool)
+
+    failure_combinations, row_combination = np.unique(
+        failed, axis=0, return_inverse=True
+    )
+    reasons = np.array(
+        [REASON_SEPARATOR.join(labels[x]) for x in failure_combinations], dtype=object
+    )
+
+    return pd.Series(
+        reasons[row_combination.reshape(-1)],
+        index=df_expectation_valid.index,
+        name=REASON_COLUMN,
+        dtype=object,
+    )
+
+
+def _query_existing_dimension_keys(table_name: str, key_column: str) -> np.ndarray:
+    """Return the distinct keys of a dimension table in the tutorial local Postgres database."""
+
+    quoted_key_column = tutorial.db.quote_identifier(key_column)
+
+    df_keys = pd.read_sql_query(
+        f"select distinct {quoted_key_column} "
+        f"from {tutorial.db.quote_identifier(table_name)} "
+        f"where {quoted_key_column} is not null",
+        con=tutorial.db.get_local_postgres_engine(),
+    )
+
+    return df_keys[key_column].to_numpy()
+
+
+def get_product_foreign_key_validity(
+    df_products: pd.DataFrame,
+    dimension_dataframes: Dict[str, pd.DataFrame],
+    include_existing: bool = True,
+) -> pd.DataFrame:
+    """Check that product foreign keys reference a known product category and subcategory.
+
+    Keys of each dimension, freshly cleaned and optionally already loaded to Postgres,
+    are collected into a single hash index, so that all product rows are checked in one
+    vectorized lookup per foreign key, with one Postgres query per dimension table.
+    Missing foreign keys are treated as valid, as in a database foreign key constraint.
+
+    Args:
+        df_products: pandas dataframe containing product data
+        dimension_dataframes: cleaned dimension data keyed by table name, e.g.
+            {"product_category": df_product_categories}
+        include_existing: also accept keys already in the Postgres dimension tables
+
+    Returns:
+        pandas dataframe aligned to df_products, with one boolean column per foreign key
+        labelled e.g. foreign_key(product_category_id), True for rows whose key exists
+    """
+
+    foreign_key_valid = {}
+
+    for key_column, table_name in PRODUCT_FOREIGN_KEYS.items():
+        key_arrays = []
+
+        if table_name in dimension_dataframes:
+            key_arrays.append(dimension_dataframes[table_name][key_column].to_numpy())
+
+        if include_existing:
+            key_arrays.append(_query_existing_dimension_keys(table_name, key_column))
+
+        known_keys = pd.Index(np.concatenate(key_arrays) if key_arrays else []).unique()
+
+        product_keys = df_products[key_column]
+        foreign_key_valid[f"foreign_key({key_column})"] = (
+            product_keys.isin(known_keys) | product_keys.isna()
+        ).to_numpy()
+
+    return pd.DataFrame(foreign_key_valid, index=df_products.index)
+
+
 def separate_valid_and_invalid_product_rows(
-    df_products: pd.DataFrame, validation_result: GxValidationResult
+    df_products: pd.DataFrame,
+    validation_result: GxValidationResult,
+    reason_column: Optional[str] = None,
+    foreign_key_validity: Optional[pd.DataFrame] = None,
 ) -> Tuple[pd.DataFrame, pd.DataFrame]:
     """Separate valid and invalid product rows based on validation results.
 
     Args:
         df_products: pandas dataframe containing product data
         validation_result: GX Validation Result object (requires COMPLETE results format)
+        reason_column: optional name of a column added to the invalid rows, listing the
+            Expectations each row failed, e.g. REASON_COLUMN
+        foreign_key_validity: optional foreign key checks, as returned by
+            get_product_foreign_key_validity, rows failing a check are also invalid
 
     Returns:
         Tuple of pandas dataframes:
@@ -328,43 +1031,163 @@ def separate_valid_and_invalid_product_rows(
             Invalid (failed validation) product data rows
     """
 
-    # Identify failing Expectations.
-    failing_expectations = []
+    if reason_column is None:
+        valid = get_product_validity_mask(df_products, validation_result)
+    else:
+        valid, df_expectation_valid = get_product_validity_mask(
+            df_products, validation_result, by_expectation=True
+        )
 
-    for result in validation_result["results"]:
-        if result["success"] is False:
-            failing_expectations.append(result)
+    # Orphan rows are invalid, and their failed foreign key checks are listed as reasons.
+    if foreign_key_validity is not None:
+        valid = valid & foreign_key_validity.to_numpy(dtype=bool).all(axis=1)
+
+        if reason_column is not None:
+            df_expectation_valid = pd.concat(
+                [df_expectation_valid, foreign_key_validity], axis=1
+            )
+
+    df_products_valid = df_products[valid].reset_index(drop=True)
+    df_products_invalid = df_products[~valid].reset_index(drop=True)
 
-    # Identify invalid rows based on Expectation unexpected_index_list.
-    invalid_row_product_ids = []
+    if reason_column is not None:
+        df_products_invalid[reason_column] = get_invalid_row_reasons(
+            df_expectation_valid[~valid]
+        ).to_numpy()
 
-    for expectation in failing_expectations:
-        invalid_row_product_ids.extend(
-            [x["product_id"] for x in expectation["result"]["unexpected_index_list"]]
+    return df_products_valid, df_products_invalid
+
+
+def get_malformed_product_rows(
+    df_malformed: pd.DataFrame,
+    reason_column: str = REASON_COLUMN,
+    parse_currency: bool = False,
+) -> pd.DataFrame:
+    """Return malformed product rows as invalid rows, listing MALFORMED_CURRENCY_REASON as their reason.
+
+    Args:
+        df_malformed: pandas dataframe of malformed product rows, as returned by
+            clean_product_data_with_malformed_rows
+        reason_column: name of the column added to the rows, e.g. REASON_COLUMN
+        parse_currency: replace the original cost and price figures with parsed values,
+            NaN for malformed figures, e.g. to load rows into the quarantine table
+
+    Returns:
+        pandas dataframe of invalid product rows
+    """
+
+    df_invalid = df_malformed.reset_index(drop=True)
+
+    if parse_currency:
+        df_invalid = df_invalid.assign(
+            **{x: _parse_currency(df_invalid[x]) for x in CURRENCY_COLUMNS}
         )
 
-    # Deduplicate invalid row product ids.
-    invalid_row_product_ids = list(set(invalid_row_product_ids))
+    df_invalid[reason_column] = MALFORMED_CURRENCY_REASON
 
-    # Separate invalid rows.
-    df_products_invalid = df_products[
-        df_products["product_id"].isin(invalid_row_product_ids)
-    ].reset_index(drop=True)
+    return df_invalid
 
-    # Separate valid rows.
-    df_products_valid = df_products.drop(
-        df_products[df_products["product_id"].isin(invalid_row_product_ids)].index
-    ).reset_index(drop=True)
 
-    return df_products_valid, df_products_invalid
+def _next_part_filepath(filepath: pathlib.Path) -> pathlib.Path:
+    """Return the next unused numbered part filepath, e.g. rows-00002.parquet for rows.parquet."""
+
+    suffix = "".join(filepath.suffixes)
+    stem = filepath.name[: -len(suffix)] if suffix else filepath.name
+
+    part = len(list(filepath.parent.glob(f"{stem}-*{suffix}")))
+    while (filepath.parent / f"{stem}-{part:05d}{suffix}").exists():
+        part += 1
+
+    return filepath.parent / f"{stem}-{part:05d}{suffix}"
 
 
-def write_invalid_rows_to_file(filepath: pathlib.Path, df: pd.DataFrame):
+def write_invalid_rows_to_file(
+    filepath: pathlib.Path,
+    df: pd.DataFrame,
+    file_format: str = "csv",
+    compression: Optional[str] = "infer",
+    partition_by: Optional[Dict[str, str]] = None,
+    append: bool = False,
+) -> pathlib.Path:
     """Write invalid rows to an error file.
 
     Args:
         filepath: full filepath to write file to
         df: pandas dataframe containing invalid rows
+        file_format: "csv" or "parquet", parquet requires pyarrow
+        compression: for csv, a pandas compression such as "gzip" or "zstd", inferred
+            from the filepath suffix by default (e.g. .csv.gz). For parquet, a codec such
+            as "snappy" or "zstd", snappy by default
+        partition_by: optional partition names and values, e.g. {"run_date": "2024-01-01"},
+            the file is written to hive-style partition directories (run_date=2024-01-01)
+            in the filepath directory
+        append: append rows to an existing csv file. Parquet files cannot be appended to,
+            so each call writes a new numbered part file next to filepath instead
+
+    Returns:
+        Path of the written file
     """
-    df.to_csv(filepath, index=False)
-    log.warning(f"{df.shape[0]} invalid rows written to error file.")
+
+    filepath = pathlib.Path(filepath)
+
+    if partition_by:
+        filepath = filepath.parent.joinpath(
+            *[f"{k}={v}" for k, v in partition_by.items()], filepath.name
+        )
+    filepath.parent.mkdir(parents=True, exist_ok=True)
+
+    if file_format == "csv":
+        write_header = not (append and filepath.exists())
+        df.to_csv(
+            filepath,
+            index=False,
+            mode="a" if append else "w",
+            header=write_header,
+            compression=compression,
+        )
+    elif file_format == "parquet":
+        if append:
+            filepath = _next_part_filepath(filepath)
+        df.to_parquet(
+            filepath,
+            index=False,
+            compression="snappy" if compression == "infer" else compression,
+        )
+    else:
+        raise ValueError(f"Unsupported invalid row file format: {file_format}")
+
+    log.warning(f"{df.shape[0]} invalid rows written to error file {filepath}.")
+
+    return filepath
+
+
+def write_invalid_rows_to_postgres(
+    df: pd.DataFrame,
+    run_id: str,
+    table_name: str = QUARANTINE_TABLE_NAME,
+    connection: Optional[sqlalchemy.engine.Connection] = None,
+) -> int:
+    """Bulk load invalid rows into the Postgres quarantine table, using COPY.
+
+    The quarantine table records the load timestamp of each row.
+
+    Args:
+        df: pandas dataframe containing invalid rows, optionally with a REASON_COLUMN
+            column listing the Expectations each row failed
+        run_id: pipeline run id recorded with each row
+        table_name: name of the quarantine table
+        connection: optional connection with an open transaction, e.g. that of the valid
+            row load, so that invalid rows are only recorded if the load commits
+
+    Returns:
+        Number of rows loaded
+    """
+
+    df_quarantine = df.assign(run_id=run_id)
+
+    rows_loaded = tutorial.db.bulk_append_dataframe_to_postgres(
+        table_name, df_quarantine, connection=connection
+    )
+    log.warning(f"{rows_loaded} invalid rows written to quarantine table {table_name}.")
+
+    return rows_loaded
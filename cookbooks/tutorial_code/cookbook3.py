@@ -1,23 +1,729 @@
 """Helper functions for Cookbook 3."""
 
+import json
+import logging
+import math
+import os
+import pathlib
+import time
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple, Union
+
 import altair as alt
+import numpy as np
 import pandas as pd
+import sqlalchemy
 import tutorial_code as tutorial
 
+log = logging.getLogger("GX validation")
+
 CUSTOMER_PROFILE_TABLE_NAME = "customer_profile"
 BINS = [0, 10, 20, 30, 40, 50, 60, 70, 80, 90, 100]
 CHART_WIDTH = 600
 CHART_HEIGHT = 300
 
+# Maximum number of decimals shown for bin edges in histogram tooltip labels.
+BIN_LABEL_DECIMALS = 2
+
+# Default number of customer profile rows fetched per chunk when streaming.
+CHUNKSIZE = 50_000
+
+# Seconds a cached customer profile dataset is reused for before being fetched again.
+DATASET_CACHE_TTL_SECONDS = 600
+
+# Maximum combined memory size of cached customer profile datasets, datasets larger than
+# this are not cached.
+DATASET_CACHE_MAX_BYTES = 256 * 1024 * 1024
+
+# Cheap table statistics used to detect customer profile table changes since a dataset
+# was cached.
+TABLE_STATISTICS_QUERY = """
+    select
+        n_live_tup,
+        n_tup_ins + n_tup_upd + n_tup_del as n_tup_modified,
+        last_analyze,
+        last_autoanalyze
+    from pg_catalog.pg_stat_user_tables
+    where relname = :table_name;
+"""
+
+# Cached customer profile datasets, keyed by the tuple of fetched columns (None for all
+# columns), with the monotonic time they were fetched and the table statistics at the time.
+_dataset_cache: Dict[Optional[Tuple[str, ...]], Tuple[float, Tuple, pd.DataFrame]] = {}
+
+
+def _select_customer_profile_query(
+    columns: Optional[List[str]] = None, key_column: Optional[str] = None
+) -> str:
+    """Return query selecting the specified columns, or all columns, of the customer profile table.
+
+    Args:
+        columns: optional list of columns to select, defaults to all columns
+        key_column: optional column to select rows by, the query then selects rows with
+            key_column greater than the :after_key parameter, in key order
+    """
+
+    select_columns = (
+        "*"
+        if columns is None
+        else ", ".join(tutorial.db.quote_identifier(x) for x in columns)
+    )
+
+    query = f"select {select_columns} from {CUSTOMER_PROFILE_TABLE_NAME}"
+
+    if key_column is not None:
+        key_column = tutorial.db.quote_identifier(key_column)
+        query += f" where {key_column} > :after_key order by {key_column}"
+
+    return query
+
+
+def _get_customer_profile_table_statistics() -> Tuple:
+    """Return current statistics for the customer profile table, used to invalidate cached datasets."""
+
+    with tutorial.db.get_cloud_postgres_engine().connect() as connection:
+        row = connection.execute(
+            sqlalchemy.text(TABLE_STATISTICS_QUERY),
+            {"table_name": CUSTOMER_PROFILE_TABLE_NAME},
+        ).fetchone()
+
+    return tuple(row) if row is not None else ()
+
+
+def _get_cached_customer_profile_data(
+    columns: Optional[List[str]] = None,
+) -> Optional[pd.DataFrame]:
+    """Return a cached customer profile dataset containing the specified columns, if one is fresh.
+
+    Datasets expire after DATASET_CACHE_TTL_SECONDS, or as soon as the customer profile
+    table statistics differ from those recorded when the dataset was cached.
+    """
+
+    if not _dataset_cache:
+        return None
+
+    now = time.monotonic()
+    table_statistics = _get_customer_profile_table_statistics()
+
+    for cached_columns, (cached_at, cached_statistics, df) in list(
+        _dataset_cache.items()
+    ):
+        if (
+            now - cached_at > DATASET_CACHE_TTL_SECONDS
+            or cached_statistics != table_statistics
+        ):
+            del _dataset_cache[cached_columns]
+            continue
 
-def _load_customer_profile_data() -> pd.DataFrame:
-    """Return sample customer profile data as pandas dataframe."""
+        if columns is None and cached_columns is None:
+            return df
 
-    return pd.read_sql_query(
-        "select * from customer_profile",
+        if columns is not None and set(columns).issubset(df.columns):
+            return df[columns]
+
+    return None
+
+
+def _cache_customer_profile_data(
+    columns: Optional[List[str]], df: pd.DataFrame, table_statistics: Tuple
+) -> None:
+    """Add a customer profile dataset to the cache, evicting the oldest datasets to respect DATASET_CACHE_MAX_BYTES."""
+
+    dataset_bytes = df.memory_usage(deep=True).sum()
+    if dataset_bytes > DATASET_CACHE_MAX_BYTES:
+        return
+
+    cached_bytes = sum(
+        x[2].memory_usage(deep=True).sum() for x in _dataset_cache.values()
+    )
+
+    for cached_columns in sorted(_dataset_cache, key=lambda x: _dataset_cache[x][0]):
+        if cached_bytes + dataset_bytes <= DATASET_CACHE_MAX_BYTES:
+            break
+        cached_bytes -= (
+            _dataset_cache.pop(cached_columns)[2].memory_usage(deep=True).sum()
+        )
+
+    cache_key = None if columns is None else tuple(columns)
+    _dataset_cache[cache_key] = (time.monotonic(), table_statistics, df)
+
+
+def invalidate_customer_profile_cache() -> None:
+    """Remove all cached customer profile datasets."""
+    _dataset_cache.clear()
+
+
+def _load_customer_profile_data(columns: Optional[List[str]] = None) -> pd.DataFrame:
+    """Return sample customer profile data as pandas dataframe.
+
+    Fetched data is cached and shared between callers, and must not be modified in place.
+
+    Args:
+        columns: optional list of columns to fetch, defaults to all columns
+    """
+
+    df = _get_cached_customer_profile_data(columns)
+    if df is not None:
+        return df
+
+    table_statistics = _get_customer_profile_table_statistics()
+
+    df = pd.read_sql_query(
+        _select_customer_profile_query(columns),
         con=tutorial.db.get_cloud_postgres_engine(),
     )
 
+    _cache_customer_profile_data(columns, df, table_statistics)
+
+    return df
+
+
+def _iter_customer_profile_data(
+    columns: Optional[List[str]] = None,
+    chunksize: int = CHUNKSIZE,
+    key_column: Optional[str] = None,
+    after_key: Any = None,
+) -> Iterator[pd.DataFrame]:
+    """Yield sample customer profile data as pandas dataframe chunks.
+
+    Rows are fetched with a server-side cursor, so only a single chunk of rows is held in
+    memory at once.
+
+    Args:
+        columns: optional list of columns to fetch, defaults to all columns
+        chunksize: number of rows per chunk
+        key_column: optional column to fetch rows in order of, see after_key
+        after_key: fetch only rows with a key_column value greater than this value,
+            all rows are fetched if None
+    """
+
+    if key_column is not None and after_key is not None:
+        query = sqlalchemy.text(_select_customer_profile_query(columns, key_column))
+        params = {"after_key": after_key}
+    else:
+        query = _select_customer_profile_query(columns)
+        params = None
+
+    with (
+        tutorial.db.get_cloud_postgres_engine()
+        .connect()
+        .execution_options(stream_results=True)
+    ) as connection:
+        yield from pd.read_sql_query(
+            query,
+            con=connection,
+            params=params,
+            chunksize=chunksize,
+        )
+
+
+# Count rows per bin interval in the database. width_bucket assigns values to bins that
+# are closed on the left, so values and (reversed) bin edges are negated to count bins
+# that are closed on the right, matching pd.cut.
+HISTOGRAM_BIN_COUNTS_QUERY = """
+    select
+        :n_bins - width_bucket(
+            (-{column})::double precision, cast(:negated_bin_edges as double precision[])
+        ) as bin_index,
+        count(*) as count
+    from {table_name}
+    where {column} > :bin_lower and {column} <= :bin_upper
+    group by 1;
+"""
+
+
+def _count_values_in_bins(
+    values: np.ndarray, bin_edges: np.ndarray, include_lowest: bool = False
+) -> np.ndarray:
+    """Return the number of values in each bin, bins are closed on the right as with pd.cut.
+
+    Args:
+        values: numeric values, null values and values outside the bin edges are not counted
+        bin_edges: increasing bin edges
+        include_lowest: also count values equal to the first bin edge in the first bin
+
+    Returns:
+        numpy array of counts, one per bin
+    """
+
+    values = np.asarray(values)
+    if values.dtype.kind not in "iuf":
+        values = values.astype(float)
+    n_bins = len(bin_edges) - 1
+
+    # Index 0 holds values at or below the first edge and index n_bins + 1 values
+    # above the last edge (or null), both of which are sliced off.
+    bin_index = np.searchsorted(bin_edges, values, side="left")
+    counts = np.bincount(bin_index, minlength=n_bins + 2)[1 : n_bins + 1]
+
+    if include_lowest:
+        counts[0] += np.count_nonzero(values == bin_edges[0])
+
+    return counts
+
+
+def _query_histogram_bin_counts(column: str, bin_edges: np.ndarray) -> np.ndarray:
+    """Return customer profile row counts per bin, computed in the database."""
+
+    query = HISTOGRAM_BIN_COUNTS_QUERY.format(
+        column=tutorial.db.quote_identifier(column),
+        table_name=CUSTOMER_PROFILE_TABLE_NAME,
+    )
+
+    df_bin_counts = pd.read_sql_query(
+        sqlalchemy.text(query),
+        con=tutorial.db.get_cloud_postgres_engine(),
+        params={
+            "n_bins": len(bin_edges) - 1,
+            "negated_bin_edges": [-float(x) for x in reversed(bin_edges)],
+            "bin_lower": float(bin_edges[0]),
+            "bin_upper": float(bin_edges[-1]),
+        },
+    )
+
+    counts = np.zeros(len(bin_edges) - 1, dtype="int64")
+    counts[df_bin_counts["bin_index"].to_numpy()] = df_bin_counts["count"].to_numpy()
+
+    return counts
+
+
+def _stream_histogram_bin_counts(column: str, bin_edges: np.ndarray) -> np.ndarray:
+    """Return customer profile row counts per bin, accumulated one streamed chunk at a time."""
+
+    counts = np.zeros(len(bin_edges) - 1, dtype="int64")
+
+    for df in tutorial.cookbook3._iter_customer_profile_data(columns=[column]):
+        counts += _count_values_in_bins(df[column].to_numpy(), bin_edges)
+
+    return counts
+
+
+def _histogram_bin_counts(
+    column: str, bin_edges: np.ndarray, pushdown: bool = True
+) -> np.ndarray:
+    """Return customer profile row counts per bin for a numeric column.
+
+    A fresh cached customer profile dataset containing the column is binned in memory
+    when available, otherwise rows are counted from the database.
+
+    Args:
+        column: name of a numeric customer profile column
+        bin_edges: increasing bin edges, bins are closed on the right as with pd.cut
+        pushdown: count rows in the database and fetch only the bin counts, otherwise
+            stream the column and count rows client-side
+
+    Returns:
+        numpy array of row counts, one per bin
+    """
+
+    # Reuse an already loaded dataset, if available, instead of querying the database.
+    df = _get_cached_customer_profile_data([column])
+    if df is not None:
+        return _count_values_in_bins(df[column].to_numpy(), bin_edges)
+
+    if pushdown:
+        return _query_histogram_bin_counts(column, bin_edges)
+
+    return _stream_histogram_bin_counts(column, bin_edges)
+
+
+def _format_bin_edges(bin_edges: np.ndarray) -> np.ndarray:
+    """Return bin edges as positional (not scientific) notation strings, e.g. 1000000 or 2.5."""
+
+    return np.array(
+        [
+            np.format_float_positional(x, precision=BIN_LABEL_DECIMALS, trim="-")
+            for x in bin_edges
+        ],
+        dtype=object,
+    )
+
+
+def _format_bin_labels(bin_lower: np.ndarray, bin_upper: np.ndarray) -> np.ndarray:
+    """Return tooltip labels for bins in lower-upper format."""
+
+    return _format_bin_edges(bin_lower) + "-" + _format_bin_edges(bin_upper)
+
+
+def _format_age_bin_labels(bin_lower: np.ndarray, bin_upper: np.ndarray) -> np.ndarray:
+    """Return tooltip labels for customer age bins, e.g. 20-30 years."""
+
+    return _format_bin_labels(bin_lower, bin_upper) + " years"
+
+
+def _format_income_bin_labels(
+    bin_lower: np.ndarray, bin_upper: np.ndarray
+) -> np.ndarray:
+    """Return tooltip labels for customer income bins, e.g. $20k-30k."""
+
+    lower_k = _format_bin_edges(np.asarray(bin_lower) / 1_000)
+    upper_k = _format_bin_edges(np.asarray(bin_upper) / 1_000)
+    labels = "$" + lower_k + "k-" + upper_k + "k"
+
+    # Label the first and last bins as open-ended.
+    labels[0] = f"Less than ${upper_k[0]}k"
+    labels[-1] = f"${lower_k[-1]}k+"
+
+    return labels
+
+
+def build_customer_profile_histogram(
+    column: str,
+    bins: Union[List[float], int, str] = BINS,
+    format_labels: Callable[[np.ndarray, np.ndarray], np.ndarray] = _format_bin_labels,
+    pushdown: bool = True,
+) -> pd.DataFrame:
+    """Return histogram data for a numeric customer profile column, ready for charting.
+
+    Args:
+        column: name of a numeric customer profile column
+        bins: list of bin edges, closed on the right as with pd.cut. Alternatively, a
+            number of bins or numpy bin estimator name (e.g. "auto", "fd") to derive
+            adaptive bin edges from the column data
+        format_labels: function returning tooltip labels given arrays of bin lower and
+            upper bounds
+        pushdown: count rows for fixed bin edges in the database, see _histogram_bin_counts
+
+    Returns:
+        pandas dataframe with one row per bin, containing the bin label, lower bound,
+        midpoint, upper bound and row count
+    """
+
+    if isinstance(bins, (int, str)):
+        # Adaptive bins require the column data, which is loaded (or reused) once.
+        values = _load_customer_profile_data([column])[column].dropna().to_numpy()
+        bin_edges = np.histogram_bin_edges(values, bins=bins)
+        counts = _count_values_in_bins(values, bin_edges, include_lowest=True)
+    else:
+        bin_edges = np.asarray(bins)
+        counts = _histogram_bin_counts(column, bin_edges, pushdown=pushdown)
+
+    return _histogram_frame(bin_edges, counts, format_labels)
+
+
+def _histogram_frame(
+    bin_edges: np.ndarray,
+    counts: np.ndarray,
+    format_labels: Callable[[np.ndarray, np.ndarray], np.ndarray],
+) -> pd.DataFrame:
+    """Return a histogram dataframe with bin labels, bounds and midpoints given bin counts."""
+
+    bin_lower = bin_edges[:-1]
+    bin_upper = bin_edges[1:]
+
+    return pd.DataFrame(
+        {
+            "binterval_str": format_labels(bin_lower, bin_upper),
+            "bin_lower": bin_lower,
+            "bin_mid": (bin_lower + bin_upper) / 2,
+            "bin_upper": bin_upper,
+            "count": counts,
+        }
+    )
+
+
+# Relative accuracy of quantiles estimated from customer profile column sketches, e.g.
+# 0.01 for estimates within 1% of the true quantile value.
+SKETCH_RELATIVE_ACCURACY = 0.01
+
+# Customer profile column with increasing values for new rows, used to fold only rows
+# added since the last sketch update.
+SKETCH_KEY_COLUMN = "customer_id"
+
+# Fixed bin edges of the customer profile column sketches.
+SKETCH_BIN_EDGES = {
+    "age": BINS,
+    "annual_income_usd": [x * 1_000 for x in BINS],
+}
+
+# Name of the json file, in the pipeline output directory, holding the persisted
+# customer profile column sketches.
+SKETCH_FILENAME = "customer_profile_sketches.json"
+
+
+class ColumnSketch:
+    """Mergeable summary of a numeric column: fixed-bin counts and a quantile sketch.
+
+    Quantiles are estimated from counts of values in logarithmically sized buckets, so
+    estimates are within relative_accuracy of the true quantile value regardless of the
+    number of values summarized. Sketches of disjoint sets of rows are combined with
+    merge, which is exact for counts and does not lose quantile accuracy.
+    """
+
+    def __init__(
+        self,
+        bin_edges: List[float],
+        relative_accuracy: float = SKETCH_RELATIVE_ACCURACY,
+    ):
+        self.bin_edges = np.asarray(bin_edges)
+        self.bin_counts = np.zeros(len(bin_edges) - 1, dtype="int64")
+        self.relative_accuracy = relative_accuracy
+        self.count = 0
+        self.null_count = 0
+        self.zero_count = 0
+        self.min = math.inf
+        self.max = -math.inf
+
+        # Quantile sketch bucket counts for positive and (absolute) negative values.
+        self.positive_counts: Dict[int, int] = {}
+        self.negative_counts: Dict[int, int] = {}
+
+        self._gamma = (1 + relative_accuracy) / (1 - relative_accuracy)
+        self._log_gamma = math.log(self._gamma)
+
+    def update(self, values: np.ndarray) -> None:
+        """Fold an array of values into the sketch, null values are only counted."""
+
+        values = np.asarray(values, dtype=float)
+        is_null = np.isnan(values)
+        self.null_count += int(np.count_nonzero(is_null))
+        values = values[~is_null]
+
+        if len(values) == 0:
+            return
+
+        self.count += len(values)
+        self.min = min(self.min, float(values.min()))
+        self.max = max(self.max, float(values.max()))
+        self.bin_counts += _count_values_in_bins(values, self.bin_edges)
+
+        self.zero_count += int(np.count_nonzero(values == 0))
+        self._update_buckets(self.positive_counts, values[values > 0])
+        self._update_buckets(self.negative_counts, -values[values < 0])
+
+    def _update_buckets(self, bucket_counts: Dict[int, int], values: np.ndarray):
+        """Add counts of positive values to their logarithmic buckets."""
+
+        keys = np.ceil(np.log(values) / self._log_gamma).astype("int64")
+        for key, count in zip(*np.unique(keys, return_counts=True)):
+            bucket_counts[int(key)] = bucket_counts.get(int(key), 0) + int(count)
+
+    def merge(self, other: "ColumnSketch") -> None:
+        """Fold another sketch, with the same bin edges and accuracy, into this sketch."""
+
+        if not np.array_equal(self.bin_edges, other.bin_edges) or (
+            self.relative_accuracy != other.relative_accuracy
+        ):
+            raise ValueError(
+                "Sketches with different bin edges or accuracy cannot be merged."
+            )
+
+        self.bin_counts += other.bin_counts
+        self.count += other.count
+        self.null_count += other.null_count
+        self.zero_count += other.zero_count
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+
+        for bucket_counts, other_bucket_counts in [
+            (self.positive_counts, other.positive_counts),
+            (self.negative_counts, other.negative_counts),
+        ]:
+            for key, count in other_bucket_counts.items():
+                bucket_counts[key] = bucket_counts.get(key, 0) + count
+
+    def quantiles(self, q: List[float]) -> np.ndarray:
+        """Return estimated values at the given quantiles, between 0 and 1."""
+
+        if self.count == 0:
+            return np.full(len(q), np.nan)
+
+        # Order bucket values from the most negative to the most positive.
+        negative_keys = sorted(self.negative_counts, reverse=True)
+        positive_keys = sorted(self.positive_counts)
+
+        bucket_values = np.concatenate(
+            [
+                -self._bucket_values(negative_keys),
+                [0.0],
+                self._bucket_values(positive_keys),
+            ]
+        )
+        bucket_counts = np.array(
+            [self.negative_counts[x] for x in negative_keys]
+            + [self.zero_count]
+            + [self.positive_counts[x] for x in positive_keys]
+        )
+
+        ranks = np.asarray(q, dtype=float) * (self.count - 1)
+        bucket_index = np.searchsorted(np.cumsum(bucket_counts), ranks, side="right")
+
+        return np.clip(bucket_values[bucket_index], self.min, self.max)
+
+    def _bucket_values(self, keys: List[int]) -> np.ndarray:
+        """Return representative values of logarithmic buckets."""
+
+        return 2 * self._gamma ** np.array(keys, dtype=float) / (self._gamma + 1)
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Return a JSON serializable representation of the sketch."""
+
+        return {
+            "bin_edges": self.bin_edges.tolist(),
+            "bin_counts": self.bin_counts.tolist(),
+            "relative_accuracy": self.relative_accuracy,
+            "count": self.count,
+            "null_count": self.null_count,
+            "zero_count": self.zero_count,
+            "min": self.min if self.count else None,
+            "max": self.max if self.count else None,
+            "positive_counts": {str(k): v for k, v in self.positive_counts.items()},
+            "negative_counts": {str(k): v for k, v in self.negative_counts.items()},
+        }
+
+    @classmethod
+    def from_dict(cls, sketch_dict: Dict[str, Any]) -> "ColumnSketch":
+        """Return a sketch from its to_dict representation."""
+
+        sketch = cls(sketch_dict["bin_edges"], sketch_dict["relative_accuracy"])
+        sketch.bin_counts = np.array(sketch_dict["bin_counts"], dtype="int64")
+        sketch.count = sketch_dict["count"]
+        sketch.null_count = sketch_dict["null_count"]
+        sketch.zero_count = sketch_dict["zero_count"]
+        if sketch.count:
+            sketch.min = sketch_dict["min"]
+            sketch.max = sketch_dict["max"]
+        sketch.positive_counts = {
+            int(k): v for k, v in sketch_dict["positive_counts"].items()
+        }
+        sketch.negative_counts = {
+            int(k): v for k, v in sketch_dict["negative_counts"].items()
+        }
+
+        return sketch
+
+
+def _read_customer_profile_sketches(
+    filepath: pathlib.Path,
+) -> Tuple[Dict[str, ColumnSketch], Any]:
+    """Return persisted column sketches and the last folded key value, if any."""
+
+    if not filepath.exists():
+        return {}, None
+
+    with open(filepath) as f:
+        sketches_dict = json.load(f)
+
+    sketches = {
+        column: ColumnSketch.from_dict(x)
+        for column, x in sketches_dict["columns"].items()
+    }
+
+    return sketches, sketches_dict["last_key"]
+
+
+def _write_customer_profile_sketches(
+    filepath: pathlib.Path, sketches: Dict[str, ColumnSketch], last_key: Any
+) -> None:
+    """Persist column sketches and the last folded key value, replacing the file atomically."""
+
+    filepath.parent.mkdir(parents=True, exist_ok=True)
+    tmp_filepath = filepath.with_name(filepath.name + ".tmp")
+
+    with open(tmp_filepath, "w") as f:
+        json.dump(
+            {
+                "last_key": last_key,
+                "columns": {column: x.to_dict() for column, x in sketches.items()},
+            },
+            f,
+        )
+
+    os.replace(tmp_filepath, filepath)
+
+
+def update_customer_profile_sketches(
+    filepath: pathlib.Path,
+    bin_edges: Optional[Dict[str, List[float]]] = None,
+    key_column: str = SKETCH_KEY_COLUMN,
+    chunksize: int = CHUNKSIZE,
+) -> Dict[str, ColumnSketch]:
+    """Fold customer profile rows added since the last update into persisted column sketches.
+
+    On the first update, or for columns without a persisted sketch, all rows are folded.
+    Afterwards only rows with a key_column value greater than the largest value already
+    folded are fetched, so the table is not rescanned as it grows.
+
+    Args:
+        filepath: path of the JSON file sketches are persisted to, e.g. SKETCH_FILENAME
+            in the pipeline output directory
+        bin_edges: fixed bin edges by column, defaults to SKETCH_BIN_EDGES
+        key_column: column with increasing values for new rows
+        chunksize: number of rows fetched per chunk
+
+    Returns:
+        Dictionary of up to date column sketches, keyed by column name
+    """
+
+    bin_edges = bin_edges or SKETCH_BIN_EDGES
+    filepath = pathlib.Path(filepath)
+
+    sketches, last_key = _read_customer_profile_sketches(filepath)
+
+    # Columns without a persisted sketch (or with changed bins) require a full rescan.
+    if set(sketches) != set(bin_edges) or any(
+        not np.array_equal(sketches[x].bin_edges, bin_edges[x]) for x in bin_edges
+    ):
+        sketches, last_key = {}, None
+
+    new_sketches = {column: ColumnSketch(x) for column, x in bin_edges.items()}
+    n_rows = 0
+
+    for df in _iter_customer_profile_data(
+        columns=[key_column] + list(bin_edges),
+        chunksize=chunksize,
+        key_column=key_column,
+        after_key=last_key,
+    ):
+        if df.empty:
+            continue
+
+        n_rows += len(df)
+        chunk_last_key = df[key_column].max().item()
+        last_key = chunk_last_key if last_key is None else max(last_key, chunk_last_key)
+
+        for column, sketch in new_sketches.items():
+            sketch.update(df[column].to_numpy())
+
+    for column, sketch in new_sketches.items():
+        if column in sketches:
+            sketches[column].merge(sketch)
+        else:
+            sketches[column] = sketch
+
+    _write_customer_profile_sketches(filepath, sketches, last_key)
+    log.info(f"Folded {n_rows} new customer profile rows into column sketches.")
+
+    return sketches
+
+
+def population_stability_index(
+    expected: ColumnSketch, actual: ColumnSketch, epsilon: float = 1e-4
+) -> float:
+    """Return the population stability index between the bin distributions of two sketches.
+
+    Values below 0.1 are commonly read as no significant distribution drift, and values
+    above 0.25 as significant drift.
+
+    Args:
+        expected: sketch of the reference data
+        actual: sketch of the data compared to the reference
+        epsilon: minimum bin proportion, avoids division by zero for empty bins
+    """
+
+    if not np.array_equal(expected.bin_edges, actual.bin_edges):
+        raise ValueError("Sketches with different bin edges cannot be compared.")
+
+    expected_pct = np.maximum(
+        expected.bin_counts / max(expected.bin_counts.sum(), 1), epsilon
+    )
+    actual_pct = np.maximum(
+        actual.bin_counts / max(actual.bin_counts.sum(), 1), epsilon
+    )
+
+    return float(
+        np.sum((actual_pct - expected_pct) * np.log(actual_pct / expected_pct))
+    )
+
 
 def _format_chart(chart: alt.Chart, chart_title: str) -> alt.Chart:
     """Standardize chart formatting."""
@@ -30,28 +736,25 @@ def _format_chart(chart: alt.Chart, chart_title: str) -> alt.Chart:
     )
 
 
-def visualize_customer_age_distribution() -> alt.Chart:
-    """Return histogram visualization of customer age data."""
+def visualize_customer_age_distribution(
+    sketch: Optional[ColumnSketch] = None,
+) -> alt.Chart:
+    """Return histogram visualization of customer age data.
 
-    # Fetch data.
-    df = tutorial.cookbook3._load_customer_profile_data()
+    Args:
+        sketch: optional customer age column sketch to chart bin counts from, instead of
+            binning the customer profile table
+    """
 
-    # Prep data for display.
-    df_hist = pd.cut(df["age"], bins=BINS).value_counts().reset_index()
-    df_hist = df_hist.rename(columns={"age": "binterval"})
-    df_hist["bin_lower"] = df_hist["binterval"].apply(lambda x: x.left)
-    df_hist["bin_upper"] = df_hist["binterval"].apply(lambda x: x.right)
-    df_hist["bin_mid"] = df_hist.apply(
-        lambda row: (row["bin_lower"] + row["bin_upper"]) / 2, axis=1
-    )
-    df_hist["binterval_str"] = df_hist.apply(
-        lambda row: f"{row['bin_lower']}-{row['bin_upper']} years", axis=1
-    )
-    df_hist = (
-        df_hist[["binterval_str", "bin_lower", "bin_mid", "bin_upper", "count"]]
-        .sort_values("bin_lower")
-        .reset_index(drop=True)
-    )
+    # Fetch binned data and prep for display.
+    if sketch is not None:
+        df_hist = _histogram_frame(
+            sketch.bin_edges, sketch.bin_counts, _format_age_bin_labels
+        )
+    else:
+        df_hist = build_customer_profile_histogram(
+            "age", bins=BINS, format_labels=_format_age_bin_labels
+        )
 
     # Assemble chart.
     chart = (
@@ -70,40 +773,27 @@ def visualize_customer_age_distribution() -> alt.Chart:
     return _format_chart(chart, chart_title="Customer age distribution")
 
 
-def visualize_customer_income_distribution() -> alt.Chart:
-    """Return histogram visualization of customer age data."""
-
-    # Fetch data.
-    df = tutorial.cookbook3._load_customer_profile_data()
+def visualize_customer_income_distribution(
+    sketch: Optional[ColumnSketch] = None,
+) -> alt.Chart:
+    """Return histogram visualization of customer age data.
 
-    # Prep data for display.
-    def convert_bin_to_tooltip(bin_lower: int, bin_upper: int) -> str:
-        if bin_lower == 0:
-            return "Less than $10k"
-        elif bin_upper == 100_000:
-            return f"$90k+"
-        else:
-            return f"${int(bin_lower/1_000)}k-{int(bin_upper/1_000)}k"
+    Args:
+        sketch: optional customer income column sketch to chart bin counts from, instead
+            of binning the customer profile table
+    """
 
-    df_hist = (
-        pd.cut(df["annual_income_usd"], bins=[x * 1_000 for x in BINS])
-        .value_counts()
-        .reset_index()
-    )
-    df_hist = df_hist.rename(columns={"annual_income_usd": "binterval"})
-    df_hist["bin_lower"] = df_hist["binterval"].apply(lambda x: x.left)
-    df_hist["bin_upper"] = df_hist["binterval"].apply(lambda x: x.right)
-    df_hist["bin_mid"] = df_hist.apply(
-        lambda row: (row["bin_lower"] + row["bin_upper"]) / 2, axis=1
-    )
-    df_hist["binterval_str"] = df_hist.apply(
-        lambda row: convert_bin_to_tooltip(row["bin_lower"], row["bin_upper"]), axis=1
-    )
-    df_hist = (
-        df_hist[["binterval_str", "bin_lower", "bin_mid", "bin_upper", "count"]]
-        .sort_values("bin_lower")
-        .reset_index(drop=True)
-    )
+    # Fetch binned data and prep for display.
+    if sketch is not None:
+        df_hist = _histogram_frame(
+            sketch.bin_edges, sketch.bin_counts, _format_income_bin_labels
+        )
+    else:
+        df_hist = build_customer_profile_histogram(
+            "annual_income_usd",
+            bins=[x * 1_000 for x in BINS],
+            format_labels=_format_income_bin_labels,
+        )
 
     # Assemble chart.
     chart = (
@@ -0,0 +1,267 @@
+"""Helper functions for DAGs to skip unchanged raw files and ingest only appended rows."""
+
+import hashlib
+import io
+import json
+import logging
+import os
+import pathlib
+from typing import Dict, Optional, Tuple
+
+import pandas as pd
+
+log = logging.getLogger("GX validation")
+
+# Name of the json file, in the pipeline output directory, holding per-file watermarks.
+WATERMARK_FILENAME = "ingestion_watermarks.json"
+
+# Name of the json file, in the pipeline output directory, holding the fingerprint of
+# each raw file as of the last successful run.
+FINGERPRINT_FILENAME = "input_fingerprints.json"
+
+# Number of bytes read at a time when hashing file contents.
+HASH_BLOCKSIZE = 1024**2
+
+# Number of bytes before the watermark offset that are fingerprinted, to detect a file
+# rewritten (rather than appended to) since the watermark was stored.
+TAIL_FINGERPRINT_BYTES = 4096
+
+
+def _fingerprint(data: bytes) -> str:
+    """Return a hex sha256 digest of data."""
+    return hashlib.sha256(data).hexdigest()
+
+
+def _read_store(store_filepath: pathlib.Path) -> Dict[str, dict]:
+    """Return persisted watermarks or fingerprints keyed by raw filepath."""
+
+    if not store_filepath.exists():
+        return {}
+
+    with open(store_filepath) as f:
+        return json.load(f)
+
+
+def _write_store(
+    store_filepath: pathlib.Path, filepath: pathlib.Path, entry: dict
+) -> None:
+    """Persist the watermark or fingerprint of a raw file, replacing the json file atomically."""
+
+    store = _read_store(store_filepath)
+    store[str(filepath)] = entry
+
+    store_filepath.parent.mkdir(parents=True, exist_ok=True)
+    tmp_filepath = store_filepath.with_name(store_filepath.name + ".tmp")
+
+    with open(tmp_filepath, "w") as f:
+        json.dump(store, f)
+
+    os.replace(tmp_filepath, store_filepath)
+
+
+def read_watermark(
+    watermark_filepath: pathlib.Path, filepath: pathlib.Path
+) -> Optional[dict]:
+    """Return the persisted watermark of a raw file, or None if it has not been ingested.
+
+    Args:
+        watermark_filepath: full filepath of the watermark json file
+        filepath: full filepath of the raw csv file
+
+    Returns:
+        Watermark dictionary with the byte offset and row count ingested so far, and
+        fingerprints of the header line and of the last TAIL_FINGERPRINT_BYTES bytes
+        before the offset
+    """
+    return _read_store(pathlib.Path(watermark_filepath)).get(str(filepath))
+
+
+def write_watermark(
+    watermark_filepath: pathlib.Path, filepath: pathlib.Path, watermark: dict
+) -> None:
+    """Persist the watermark of a raw file, replacing the watermark json file atomically.
+
+    Call once the rows read up to the watermark have been loaded, so that a failed run
+    rereads the same rows.
+
+    Args:
+        watermark_filepath: full filepath of the watermark json file
+        filepath: full filepath of the raw csv file
+        watermark: watermark dictionary, as returned by read_appended_csv
+    """
+
+    _write_store(pathlib.Path(watermark_filepath), filepath, watermark)
+
+
+def _is_appended(f: io.BufferedReader, header: bytes, watermark: dict) -> bool:
+    """Return True if an open raw file still holds the bytes ingested up to the watermark."""
+
+    if _fingerprint(header) != watermark["header_fingerprint"]:
+        return False
+
+    if os.fstat(f.fileno()).st_size < watermark["offset"]:
+        return False
+
+    tail_start = max(len(header), watermark["offset"] - TAIL_FINGERPRINT_BYTES)
+    f.seek(tail_start)
+
+    return (
+        _fingerprint(f.read(watermark["offset"] - tail_start))
+        == watermark["tail_fingerprint"]
+    )
+
+
+def read_appended_csv(
+    filepath: pathlib.Path, watermark_filepath: pathlib.Path, **read_csv_kwargs
+) -> Tuple[pd.DataFrame, dict]:
+    """Read the rows appended to a raw csv file since its persisted watermark.
+
+    Only bytes after the watermark offset are read and parsed, together with the header
+    line. The whole file is read instead if it has no watermark, or if it was rewritten
+    since, i.e. it shrank, or its header or the last TAIL_FINGERPRINT_BYTES bytes before
+    the offset changed. Other bytes before the offset are not checked, so an in-place
+    edit earlier in the file is not detected. A final line without a line break, e.g.
+    one still being written, is held back for the next run. If it is then unchanged and
+    nothing was appended after it, it is read as a complete row. Quoted values spanning
+    multiple lines are not supported.
+
+    Args:
+        filepath: full filepath of the raw csv file
+        watermark_filepath: full filepath of the watermark json file
+        read_csv_kwargs: keyword arguments passed to pandas read_csv, e.g. encoding
+
+    Returns:
+        Tuple containing:
+            pandas dataframe of the appended rows
+            new watermark to persist with write_watermark once the rows are loaded
+    """
+
+    watermark = read_watermark(watermark_filepath, filepath)
+
+    with open(filepath, "rb") as f:
+        header = f.readline()
+
+        if watermark is not None and _is_appended(f, header, watermark):
+            offset, rows = watermark["offset"], watermark["rows"]
+            held_back_fingerprint = watermark.get("held_back_fingerprint")
+        else:
+            if watermark is not None:
+                log.warning(f"{filepath} was rewritten, reprocessing the whole file.")
+            offset, rows, held_back_fingerprint = len(header), 0, None
+
+        f.seek(offset)
+        data = f.read()
+
+        # Hold back a final line without a line break, unless it was already held back
+        # by the previous run and is unchanged.
+        held_back = data[data.rfind(b"\n") + 1 :]
+        if held_back and _fingerprint(held_back) != held_back_fingerprint:
+            data = data[: len(data) - len(held_back)]
+            log.warning(
+                f"{len(held_back)} bytes after the last line break of {filepath} held "
+                "back until the next run."
+            )
+        else:
+            held_back = b""
+
+        new_offset = offset + len(data)
+
+        tail_start = max(len(header), new_offset - TAIL_FINGERPRINT_BYTES)
+        f.seek(tail_start)
+        tail = f.read(new_offset - tail_start)
+
+    df = pd.read_csv(io.BytesIO(header + data), **read_csv_kwargs)
+
+    new_watermark = {
+        "offset": new_offset,
+        "rows": rows + df.shape[0],
+        "header_fingerprint": _fingerprint(header),
+        "tail_fingerprint": _fingerprint(tail),
+        "held_back_fingerprint": _fingerprint(held_back) if held_back else None,
+    }
+
+    log.info(f"{df.shape[0]} appended rows read from {filepath} (offset {offset}).")
+
+    return df, new_watermark
+
+
+def file_fingerprint(
+    filepath: pathlib.Path, previous_fingerprint: Optional[dict] = None
+) -> dict:
+    """Return the size, modification time and content hash of a file.
+
+    The content hash of previous_fingerprint is reused when the file size and
+    modification time are unchanged, so that the file is only read when it may differ.
+
+    Args:
+        filepath: full filepath of the raw file
+        previous_fingerprint: optional fingerprint of the same file, e.g. from a previous run
+
+    Returns:
+        Fingerprint dictionary with the file size, modification time in nanoseconds and
+        sha256 content hash
+    """
+
+    stat = os.stat(filepath)
+    fingerprint = {"size": stat.st_size, "mtime_ns": stat.st_mtime_ns}
+
+    if previous_fingerprint is not None and all(
+        previous_fingerprint.get(x) == fingerprint[x] for x in fingerprint
+    ):
+        return {**fingerprint, "sha256": previous_fingerprint["sha256"]}
+
+    content_hash = hashlib.sha256()
+    with open(filepath, "rb") as f:
+        for block in iter(lambda: f.read(HASH_BLOCKSIZE), b""):
+            content_hash.update(block)
+
+    return {**fingerprint, "sha256": content_hash.hexdigest()}
+
+
+def check_input_unchanged(
+    fingerprint_filepath: pathlib.Path, filepath: pathlib.Path
+) -> Tuple[bool, dict]:
+    """Check whether a raw file is unchanged since the last successful run.
+
+    A file with the same size and modification time as recorded is unchanged without
+    being read, otherwise its contents are hashed and compared. If only the modification
+    time changed, e.g. the same data was delivered again, the recorded fingerprint is
+    updated so that the next check does not read the file.
+
+    Args:
+        fingerprint_filepath: full filepath of the fingerprint json file
+        filepath: full filepath of the raw file
+
+    Returns:
+        Tuple containing:
+            True if the file is unchanged since the last successful run
+            current fingerprint, to record with write_input_fingerprint after a
+            successful run
+    """
+
+    fingerprint_filepath = pathlib.Path(fingerprint_filepath)
+    previous_fingerprint = _read_store(fingerprint_filepath).get(str(filepath))
+    fingerprint = file_fingerprint(filepath, previous_fingerprint)
+
+    if previous_fingerprint is None:
+        return False, fingerprint
+
+    unchanged = fingerprint["sha256"] == previous_fingerprint["sha256"]
+
+    if unchanged and fingerprint != previous_fingerprint:
+        _write_store(fingerprint_filepath, filepath, fingerprint)
+
+    return unchanged, fingerprint
+
+
+def write_input_fingerprint(
+    fingerprint_filepath: pathlib.Path, filepath: pathlib.Path, fingerprint: dict
+) -> None:
+    """Record the fingerprint of a raw file once a run using it has succeeded.
+
+    Args:
+        fingerprint_filepath: full filepath of the fingerprint json file
+        filepath: full filepath of the raw file
+        fingerprint: fingerprint dictionary, as returned by check_input_unchanged
+    """
+    _write_store(pathlib.Path(fingerprint_filepath), filepath, fingerprint)
@@ -2,6 +2,7 @@ import datetime
 import logging
 import os
 import pathlib
+from typing import Optional
 
 import pandas as pd
 import tutorial_code as tutorial
@@ -10,20 +11,115 @@ from airflow.operators.python import PythonOperator
 
 log = logging.getLogger("GX validation")
 
+# Number of raw customer rows to process per chunk, set to None to process the full
+# file in memory at once. Chunks are inserted in a single transaction, so if any chunk
+# fails validation no rows are inserted.
+CUSTOMER_DATA_CHUNKSIZE = None
+
+# Load only new or changed customer rows, by comparing row content hashes, instead of
+# inserting all rows and ignoring existing ones.
+CUSTOMER_DATA_DELTA_LOAD = False
+
+# Read only the raw customer rows appended since the last successful run, falling back
+# to the whole file when it was rewritten.
+CUSTOMER_DATA_INCREMENTAL = False
+
+# Skip the run when the raw customer data is unchanged since the last successful run.
+SKIP_UNCHANGED_CUSTOMER_DATA = False
+
 
 def get_airflow_home_dir() -> pathlib.Path:
     return pathlib.Path(os.getenv("AIRFLOW_HOME"))
 
 
-def cookbook1_validate_and_ingest_to_postgres():
+def cookbook1_validate_and_ingest_to_postgres(
+    chunksize: Optional[int] = None,
+    delta_load: bool = False,
+    incremental: bool = False,
+    skip_unchanged: bool = False,
+):
 
     DATA_DIR = get_airflow_home_dir() / "data" / "raw"
-
-    # Load and clean raw customer data.
-    df_customers_raw = pd.read_csv(
-        DATA_DIR / "customers.csv", encoding="unicode_escape"
+    OUTPUT_DATA_DIR = get_airflow_home_dir() / "airflow_pipeline_output"
+    WATERMARK_FILEPATH = OUTPUT_DATA_DIR / tutorial.incremental.WATERMARK_FILENAME
+    FINGERPRINT_FILEPATH = OUTPUT_DATA_DIR / tutorial.incremental.FINGERPRINT_FILENAME
+    UNMAPPED_ROWS_FILEPATH = OUTPUT_DATA_DIR / "cookbook1_unmapped_customer_rows.csv"
+
+    # Chunked processing always inserts all raw rows, ignoring existing rows.
+    if chunksize is not None and (delta_load or incremental):
+        raise ValueError(
+            "Chunked customer data processing does not support delta_load or incremental."
+        )
+
+    # Skip the run if the raw customer data is unchanged since the last successful run.
+    if skip_unchanged:
+        unchanged, fingerprint = tutorial.incremental.check_input_unchanged(
+            FINGERPRINT_FILEPATH, DATA_DIR / "customers.csv"
+        )
+
+        if unchanged:
+            log.info("Raw customer data unchanged since the last successful run.")
+            return
+
+    # Stream the raw customer data in chunks to bound memory use on large files.
+    if chunksize is not None:
+        df_chunk_results = (
+            tutorial.cookbook1.validate_and_ingest_customer_data_in_chunks(
+                DATA_DIR / "customers.csv",
+                chunksize=chunksize,
+                unmapped_rows_filepath=UNMAPPED_ROWS_FILEPATH,
+            )
+        )
+
+        failed_chunks = df_chunk_results[~df_chunk_results["success"]]
+
+        log.info(
+            f"{df_chunk_results['rows_inserted'].sum()} new rows inserted from "
+            f"{df_chunk_results.shape[0]} chunks ({df_chunk_results['rows'].sum()} rows)."
+        )
+
+        # Halt pipeline with error if validation fails for any chunk.
+        if failed_chunks.shape[0] > 0:
+            raise Exception(
+                f"GX data validation failed for chunks: {list(failed_chunks['chunk'])}"
+            )
+
+        if skip_unchanged:
+            tutorial.incremental.write_input_fingerprint(
+                FINGERPRINT_FILEPATH, DATA_DIR / "customers.csv", fingerprint
+            )
+
+        return
+
+    # Load and clean raw customer data, in incremental mode only the rows appended since
+    # the last successful run.
+    if incremental:
+        df_customers_raw, watermark = tutorial.incremental.read_appended_csv(
+            DATA_DIR / "customers.csv",
+            WATERMARK_FILEPATH,
+            encoding="unicode_escape",
+            dtype=tutorial.cookbook1.RAW_COLUMN_DTYPES,
+        )
+
+        if df_customers_raw.empty:
+            log.info("No new customer rows to ingest.")
+            return
+    else:
+        df_customers_raw = pd.read_csv(
+            DATA_DIR / "customers.csv",
+            encoding="unicode_escape",
+            dtype=tutorial.cookbook1.RAW_COLUMN_DTYPES,
+        )
+
+    df_customers, df_customers_unmapped = (
+        tutorial.cookbook1.clean_customer_data_with_unmapped_rows(df_customers_raw)
     )
-    df_customers = tutorial.cookbook1.clean_customer_data(df_customers_raw)
+
+    # Write rows with an unmapped country, which are not loaded, to error file.
+    if df_customers_unmapped.shape[0] > 0:
+        tutorial.cookbook1.write_unmapped_rows_to_file(
+            UNMAPPED_ROWS_FILEPATH, df_customers_unmapped
+        )
 
     # Validate customer data using GX.
     validation_result = tutorial.cookbook1.validate_customer_data(df_customers)
@@ -32,12 +128,36 @@ def cookbook1_validate_and_ingest_to_postgres():
     if not validation_result["success"]:
         raise Exception("GX data validation failed.")
 
-    # Write data to Postgres table.
-    rows_inserted = tutorial.db.insert_ignore_dataframe_to_postgres(
-        table_name="customers", dataframe=df_customers
-    )
+    # Write only new or changed rows to Postgres table, updating changed rows.
+    if delta_load:
+        row_counts = tutorial.db.delta_upsert_dataframe_to_postgres(
+            table_name="customers", dataframe=df_customers
+        )
+
+        log.info(
+            f"{row_counts['inserted']} new rows inserted, {row_counts['updated']} rows "
+            f"updated, {row_counts['unchanged']} rows unchanged."
+        )
+
+    else:
+        # Write data to Postgres table using COPY, ignoring existing rows.
+        rows_inserted = tutorial.db.bulk_insert_ignore_dataframe_to_postgres(
+            table_name="customers", dataframe=df_customers
+        )
+
+        log.info(f"{rows_inserted} new rows inserted.")
+
+    # Record the rows read once they are loaded, so that a failed run rereads them.
+    if incremental:
+        tutorial.incremental.write_watermark(
+            WATERMARK_FILEPATH, DATA_DIR / "customers.csv", watermark
+        )
 
-    log.info(f"{rows_inserted} new rows inserted.")
+    # Record the raw customer data fingerprint once the run has succeeded.
+    if skip_unchanged:
+        tutorial.incremental.write_input_fingerprint(
+            FINGERPRINT_FILEPATH, DATA_DIR / "customers.csv", fingerprint
+        )
 
 
 default_args = {
@@ -56,6 +176,12 @@ gx_dag = DAG(
 run_gx_task = PythonOperator(
     task_id="cookbook1_validate_and_ingest_to_postgres",
     python_callable=cookbook1_validate_and_ingest_to_postgres,
+    op_kwargs={
+        "chunksize": CUSTOMER_DATA_CHUNKSIZE,
+        "delta_load": CUSTOMER_DATA_DELTA_LOAD,
+        "incremental": CUSTOMER_DATA_INCREMENTAL,
+        "skip_unchanged": SKIP_UNCHANGED_CUSTOMER_DATA,
+    },
     dag=gx_dag,
 )
 
@@ -2,6 +2,7 @@ import datetime
 import logging
 import os
 import pathlib
+from typing import Optional
 
 import pandas as pd
 import tutorial_code as tutorial
@@ -10,32 +11,89 @@ from airflow.operators.python import PythonOperator
 
 log = logging.getLogger("GX validation")
 
+# Where invalid product rows are written: "file" for a csv error file in the pipeline
+# output directory, or "postgres" for the products_quarantine table.
+INVALID_PRODUCT_ROWS_SINK = "file"
+
+# Seconds to wait for the concurrent product, category and subcategory validations, or
+# None to wait without a limit. The validations run in threads, as the Airflow task
+# process is daemonic and cannot start worker processes, so a timed out validation is
+# not stopped. The task execution timeout below stops the task itself.
+PRODUCT_VALIDATION_TIMEOUT_SECONDS = 600
+
+# Maximum run time of the DAG task, after which Airflow fails the task.
+TASK_EXECUTION_TIMEOUT = datetime.timedelta(minutes=30)
+
+# Read only the raw product rows appended since the last successful run, falling back to
+# the whole file when it was rewritten.
+PRODUCT_DATA_INCREMENTAL = False
+
+# Skip the run when the raw product data is unchanged since the last successful run.
+SKIP_UNCHANGED_PRODUCT_DATA = False
+
 
 def get_airflow_home_dir() -> pathlib.Path:
     return pathlib.Path(os.getenv("AIRFLOW_HOME"))
 
 
-def cookbook2_validate_and_handle_invalid_data():
+def cookbook2_validate_and_handle_invalid_data(
+    run_id: Optional[str] = None,
+    invalid_rows_sink: str = "file",
+    incremental: bool = False,
+    skip_unchanged: bool = False,
+):
 
     RAW_DATA_DIR = get_airflow_home_dir() / "data/raw"
     OUTPUT_DATA_DIR = get_airflow_home_dir() / "airflow_pipeline_output"
+    WATERMARK_FILEPATH = OUTPUT_DATA_DIR / tutorial.incremental.WATERMARK_FILENAME
+    FINGERPRINT_FILEPATH = OUTPUT_DATA_DIR / tutorial.incremental.FINGERPRINT_FILENAME
 
-    # Load and clean raw product data.
-    df_products_raw = pd.read_csv(
-        RAW_DATA_DIR / "products.csv", encoding="unicode_escape"
-    )
+    # Skip the run if the raw product data is unchanged since the last successful run.
+    if skip_unchanged:
+        unchanged, fingerprint = tutorial.incremental.check_input_unchanged(
+            FINGERPRINT_FILEPATH, RAW_DATA_DIR / "products.csv"
+        )
 
-    df_products, df_product_categories, df_product_subcategories = (
-        tutorial.cookbook2.clean_product_data(df_products_raw)
-    )
+        if unchanged:
+            log.info("Raw product data unchanged since the last successful run.")
+            return
 
-    # Validate product data using GX.
+    # Load and clean raw product data, in incremental mode only the rows appended since
+    # the last successful run.
+    if incremental:
+        df_products_raw, watermark = tutorial.incremental.read_appended_csv(
+            RAW_DATA_DIR / "products.csv", WATERMARK_FILEPATH, encoding="unicode_escape"
+        )
+
+        if df_products_raw.empty:
+            log.info("No new product rows to ingest.")
+            return
+    else:
+        df_products_raw = pd.read_csv(
+            RAW_DATA_DIR / "products.csv", encoding="unicode_escape"
+        )
+
+    # Rows with a malformed cost or price are separated, and handled as invalid rows.
+    (
+        df_products,
+        df_product_categories,
+        df_product_subcategories,
+        df_products_malformed,
+    ) = tutorial.cookbook2.clean_product_data_with_malformed_rows(df_products_raw)
+
+    # Validate product, category and subcategory data concurrently using GX. Detailed
+    # results, used to separate invalid rows, are only collected for failed Expectations.
     (
         products_validation_result,
         product_category_validation_result,
         product_subcategory_validation_result,
     ) = tutorial.cookbook2.validate_product_data(
-        df_products, df_product_categories, df_product_subcategories
+        df_products,
+        df_product_categories,
+        df_product_subcategories,
+        concurrent_validation=True,
+        timeout=PRODUCT_VALIDATION_TIMEOUT_SECONDS,
+        two_phase=True,
     )
 
     # Halt pipeline with error if validation fails for product category or subcategory results.
@@ -45,41 +103,93 @@ def cookbook2_validate_and_handle_invalid_data():
     if not product_subcategory_validation_result["success"]:
         raise Exception("GX data validation for product subcategories failed.")
 
-    # Write product category and subcategory data to Postgres tables.
-    product_category_rows_inserted = tutorial.db.insert_ignore_dataframe_to_postgres(
-        table_name="product_category", dataframe=df_product_categories
-    )
-
-    log.info(f"{product_category_rows_inserted} new product category rows inserted.")
-
-    product_subcategory_rows_inserted = tutorial.db.insert_ignore_dataframe_to_postgres(
-        table_name="product_subcategory", dataframe=df_product_subcategories
+    # Check that each product references a known category and subcategory, either about
+    # to be loaded or already in Postgres.
+    df_foreign_key_valid = tutorial.cookbook2.get_product_foreign_key_validity(
+        df_products,
+        {
+            "product_category": df_product_categories,
+            "product_subcategory": df_product_subcategories,
+        },
     )
 
-    log.info(
-        f"{product_subcategory_rows_inserted} new product subcategory rows inserted."
-    )
+    # If validation or the foreign key check fails for product rows, automatically
+    # remove failing rows. Write failing and malformed rows to error file (or quarantine
+    # table, with the load below). Write all remaining valid rows to Postgres.
+    invalid_row_dataframes = []
 
-    # If validation fails for product rows, automatically remove failing rows and write
-    # to error file. Write all remaining valid rows to Postgres.
-    if not products_validation_result["success"]:
-        df_products_valid, df_products_invalid = (
+    if (
+        not products_validation_result["success"]
+        or not df_foreign_key_valid.to_numpy().all()
+    ):
+        df_products_valid, df_products_failed = (
             tutorial.cookbook2.separate_valid_and_invalid_product_rows(
-                df_products, products_validation_result
+                df_products,
+                products_validation_result,
+                reason_column=tutorial.cookbook2.REASON_COLUMN,
+                foreign_key_validity=df_foreign_key_valid,
             )
         )
-        tutorial.cookbook2.write_invalid_rows_to_file(
-            OUTPUT_DATA_DIR / "cookbook2_invalid_product_rows.csv", df_products_invalid
-        )
+        invalid_row_dataframes.append(df_products_failed)
 
     else:
         df_products_valid = df_products
 
-    product_rows_inserted = tutorial.db.insert_ignore_dataframe_to_postgres(
-        table_name="products", dataframe=df_products_valid
+    if df_products_malformed.shape[0] > 0:
+        invalid_row_dataframes.append(
+            tutorial.cookbook2.get_malformed_product_rows(
+                df_products_malformed,
+                reason_column=tutorial.cookbook2.REASON_COLUMN,
+                parse_currency=invalid_rows_sink == "postgres",
+            )
+        )
+
+    df_products_invalid = (
+        pd.concat(invalid_row_dataframes, ignore_index=True)
+        if invalid_row_dataframes
+        else None
     )
 
-    log.info(f"{product_rows_inserted} new product rows inserted.")
+    if df_products_invalid is not None and invalid_rows_sink != "postgres":
+        tutorial.cookbook2.write_invalid_rows_to_file(
+            OUTPUT_DATA_DIR / "cookbook2_invalid_product_rows.csv",
+            df_products_invalid,
+        )
+
+    # Write product category, subcategory and valid product data, and any quarantined
+    # invalid rows, to Postgres tables in a single transaction, so that a failed load
+    # leaves no partially loaded tables and a retry does not quarantine rows twice.
+    with tutorial.db.begin_local_postgres_transaction() as connection:
+        if invalid_rows_sink == "postgres" and df_products_invalid is not None:
+            tutorial.cookbook2.write_invalid_rows_to_postgres(
+                df_products_invalid,
+                run_id=run_id or f"manual__{datetime.datetime.now().isoformat()}",
+                connection=connection,
+            )
+
+        rows_inserted = tutorial.db.bulk_insert_ignore_dataframes_to_postgres(
+            {
+                "product_category": df_product_categories,
+                "product_subcategory": df_product_subcategories,
+                "products": df_products_valid,
+            },
+            connection=connection,
+        )
+
+    for table_name, table_rows_inserted in rows_inserted.items():
+        log.info(f"{table_rows_inserted} new {table_name} rows inserted.")
+
+    # Record the rows read once they are loaded, so that a failed run rereads them.
+    if incremental:
+        tutorial.incremental.write_watermark(
+            WATERMARK_FILEPATH, RAW_DATA_DIR / "products.csv", watermark
+        )
+
+    # Record the raw product data fingerprint once the run has succeeded.
+    if skip_unchanged:
+        tutorial.incremental.write_input_fingerprint(
+            FINGERPRINT_FILEPATH, RAW_DATA_DIR / "products.csv", fingerprint
+        )
 
 
 default_args = {
@@ -98,6 +208,12 @@ gx_dag = DAG(
 run_gx_task = PythonOperator(
     task_id="cookbook2_validate_and_handle_invalid_data",
     python_callable=cookbook2_validate_and_handle_invalid_data,
+    op_kwargs={
+        "invalid_rows_sink": INVALID_PRODUCT_ROWS_SINK,
+        "incremental": PRODUCT_DATA_INCREMENTAL,
+        "skip_unchanged": SKIP_UNCHANGED_PRODUCT_DATA,
+    },
+    execution_timeout=TASK_EXECUTION_TIMEOUT,
     dag=gx_dag,
 )
 
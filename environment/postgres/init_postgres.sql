@@ -49,6 +49,25 @@ create table public.product_subcategory (
     name text
 );
 
+-- Invalid product rows, with the pipeline run and Expectations they failed.
+create table public.products_quarantine (
+    quarantine_id bigserial primary key,
+    run_id text not null,
+    quarantined_at timestamptz not null default now(),
+    failed_expectations text,
+    product_id bigint,
+    name text,
+    brand text,
+    color text,
+    unit_cost_usd double precision,
+    unit_price_usd double precision,
+    product_category_id bigint,
+    product_subcategory_id bigint
+);
+
+create index products_quarantine_run_id_idx on public.products_quarantine (run_id);
+create index products_quarantine_product_id_idx on public.products_quarantine (product_id);
+
 -- Create role airflow_user.
 do $$ begin if not exists (
     select 1
@@ -63,3 +82,12 @@ alter user airflow_user with superuser;
 create database airflow;
 grant all privileges on database airflow to airflow_user;
 grant all on schema public to airflow_user;
+
+-- Content hash of each loaded row, keyed by table and primary key value, used to load
+-- only new or changed rows.
+create table public.row_hashes (
+    table_name text,
+    row_key text,
+    row_hash bigint not null,
+    primary key (table_name, row_key)
+);
@@ -113,6 +113,41 @@ def test_clean_customer_data(raw_customer_data):
     }
 
 
+def test_clean_customer_data_with_unmapped_rows(tmp_path, raw_customer_data):
+    """Test that rows with an unmapped country are separated instead of raising an error."""
+    raw_customer_data.loc[1, "Country"] = "Sesame Street"
+
+    df_cleaned, df_unmapped = tutorial.cookbook1.clean_customer_data_with_unmapped_rows(
+        raw_customer_data
+    )
+
+    assert list(df_cleaned["customer_id"]) == [1693133]
+    assert list(df_cleaned["country"]) == ["US"]
+
+    assert df_unmapped.to_dict(orient="records") == [
+        {
+            "customer_id": 887837,
+            "name": "Ileen van Dael",
+            "city": "Utrecht",
+            "state": "UT",
+            "zip": "3532 XR",
+            "country": "Sesame Street",
+        }
+    ]
+
+    # Unmapped rows are dropped from the default cleaning output.
+    df_cleaned = tutorial.cookbook1.clean_customer_data(raw_customer_data)
+    assert list(df_cleaned["customer_id"]) == [1693133]
+
+    # Unmapped rows are appended to an error file.
+    for append in [False, True]:
+        tutorial.cookbook1.write_unmapped_rows_to_file(
+            tmp_path / "unmapped.csv", df_unmapped, append=append
+        )
+
+    assert list(pd.read_csv(tmp_path / "unmapped.csv")["customer_id"]) == [887837] * 2
+
+
 def test_validate_customer_data_with_valid_data(valid_cleaned_customer_data):
     """Test validate_customer_data succeeds on valid data."""
     validation_result = tutorial.cookbook1.validate_customer_data(
@@ -147,6 +182,73 @@ def test_validate_customer_data_with_invalid_data(invalid_cleaned_customer_data)
     assert failed_expectations == ["expect_column_values_to_be_in_set"]
 
 
+def test_customer_data_validator_reuse(
+    valid_cleaned_customer_data, invalid_cleaned_customer_data
+):
+    """Test that a single CustomerDataValidator validates multiple dataframes."""
+    validator = tutorial.cookbook1.CustomerDataValidator()
+
+    assert validator.validate(valid_cleaned_customer_data)["success"] is True
+    assert validator.validate(invalid_cleaned_customer_data)["success"] is False
+    assert validator.validate(valid_cleaned_customer_data)["success"] is True
+
+
+def test_validate_customer_data_in_parallel(
+    valid_cleaned_customer_data, invalid_cleaned_customer_data
+):
+    """Test that shard Validation Results are merged into a single Validation Result."""
+    df_customers = pd.concat(
+        [valid_cleaned_customer_data, invalid_cleaned_customer_data] * 2
+    ).reset_index(drop=True)
+
+    validation_result = tutorial.cookbook1.validate_customer_data_in_parallel(
+        df_customers, n_shards=4, max_workers=2
+    )
+
+    assert isinstance(
+        validation_result,
+        gx.core.expectation_validation_result.ExpectationSuiteValidationResult,
+    )
+    assert validation_result["success"] is False
+    assert validation_result["statistics"]["evaluated_expectations"] == 7
+
+    country_result = validation_result["results"][-1]
+    assert country_result["success"] is False
+    assert country_result["result"]["element_count"] == 4
+    assert country_result["result"]["unexpected_count"] == 2
+    assert country_result["result"]["unexpected_percent"] == 50.0
+    assert country_result["result"]["partial_unexpected_index_list"] == [1, 3]
+
+
+def test_merge_validation_results_without_missing_count():
+    """Test that shard results of Expectations that report no missing count are merged."""
+    context = gx.get_context(mode="ephemeral")
+    batch_definition = (
+        context.data_sources.add_pandas("pandas")
+        .add_dataframe_asset(name="customer data")
+        .add_batch_definition_whole_dataframe("batch definition")
+    )
+    suite = context.suites.add(gx.ExpectationSuite(name="customer expectations"))
+    suite.add_expectation(gx.expectations.ExpectColumnValuesToNotBeNull(column="zip"))
+
+    shards = [
+        pd.DataFrame({"zip": ["10123", None]}),
+        pd.DataFrame({"zip": [None, None]}, index=[2, 3]),
+    ]
+    validation_results = [
+        batch_definition.get_batch(batch_parameters={"dataframe": x}).validate(suite)
+        for x in shards
+    ]
+
+    validation_result = tutorial.cookbook1._merge_validation_results(validation_results)
+
+    not_null_result = validation_result["results"][0]
+    assert not_null_result["success"] is False
+    assert not_null_result["result"]["element_count"] == 4
+    assert not_null_result["result"]["unexpected_count"] == 3
+    assert not_null_result["result"]["unexpected_percent"] == 75.0
+
+
 def test_airflow_dag_trigger(tmp_path, monkeypatch):
     """Test Airflow DAG code runs without error."""
 
@@ -171,3 +273,111 @@ def test_airflow_dag_trigger(tmp_path, monkeypatch):
     airflow_dag.cookbook1_validate_and_ingest_to_postgres()
 
     assert tutorial.db.get_table_row_count("customers") == 15266
+
+
+def test_airflow_dag_chunked(tmp_path, monkeypatch):
+    """Test Airflow DAG code runs without error when processing data in chunks."""
+
+    # Create tmp directories for test data.
+    (tmp_path / "data" / "raw").mkdir(parents=True)
+
+    def mock_get_airflow_home_dir():
+        return tmp_path
+
+    monkeypatch.setattr(airflow_dag, "get_airflow_home_dir", mock_get_airflow_home_dir)
+
+    # Add customer data to tmp directory.
+    shutil.copy("/cookbooks/data/raw/customers.csv", tmp_path / "data/raw")
+
+    tutorial.db.drop_all_table_rows("customers")
+    assert tutorial.db.get_table_row_count("customers") == 0
+
+    airflow_dag.cookbook1_validate_and_ingest_to_postgres(chunksize=5_000)
+
+    assert tutorial.db.get_table_row_count("customers") == 15266
+
+    # Chunked processing cannot be combined with delta or incremental loads.
+    with pytest.raises(ValueError):
+        airflow_dag.cookbook1_validate_and_ingest_to_postgres(
+            chunksize=5_000, incremental=True
+        )
+
+
+def test_validate_and_ingest_customer_data_in_chunks_rolls_back(
+    tmp_path, raw_customer_data
+):
+    """Test that no chunks are inserted if any chunk fails validation."""
+    pd.concat(
+        [raw_customer_data, raw_customer_data.assign(CustomerKey=["a", "b"])]
+    ).to_csv(tmp_path / "customers.csv", index=False)
+
+    tutorial.db.drop_all_table_rows("customers")
+
+    df_chunk_results = tutorial.cookbook1.validate_and_ingest_customer_data_in_chunks(
+        tmp_path / "customers.csv", chunksize=2
+    )
+
+    assert list(df_chunk_results["success"]) == [True, False]
+    assert list(df_chunk_results["rows_inserted"]) == [0, 0]
+    assert tutorial.db.get_table_row_count("customers") == 0
+
+
+def test_airflow_dag_delta_load(tmp_path, monkeypatch):
+    """Test Airflow DAG code loads only new or changed rows in delta load mode."""
+
+    (tmp_path / "data" / "raw").mkdir(parents=True)
+
+    def mock_get_airflow_home_dir():
+        return tmp_path
+
+    monkeypatch.setattr(airflow_dag, "get_airflow_home_dir", mock_get_airflow_home_dir)
+
+    shutil.copy("/cookbooks/data/raw/customers.csv", tmp_path / "data/raw")
+
+    tutorial.db.drop_all_table_rows("customers")
+
+    airflow_dag.cookbook1_validate_and_ingest_to_postgres(delta_load=True)
+    assert tutorial.db.get_table_row_count("customers") == 15266
+
+    # A second run of the same extract finds every row unchanged.
+    row_counts = tutorial.db.delta_upsert_dataframe_to_postgres(
+        "customers",
+        tutorial.cookbook1.clean_customer_data(
+            pd.read_csv(tmp_path / "data/raw/customers.csv", encoding="unicode_escape")
+        ),
+    )
+    assert row_counts == {"inserted": 0, "updated": 0, "unchanged": 15266}
+
+
+def test_airflow_dag_incremental(tmp_path, monkeypatch):
+    """Test Airflow DAG code ingests only appended rows in incremental mode."""
+
+    (tmp_path / "data" / "raw").mkdir(parents=True)
+
+    def mock_get_airflow_home_dir():
+        return tmp_path
+
+    monkeypatch.setattr(airflow_dag, "get_airflow_home_dir", mock_get_airflow_home_dir)
+
+    shutil.copy("/cookbooks/data/raw/customers.csv", tmp_path / "data/raw")
+
+    tutorial.db.drop_all_table_rows("customers")
+
+    airflow_dag.cookbook1_validate_and_ingest_to_postgres(incremental=True)
+    assert tutorial.db.get_table_row_count("customers") == 15266
+
+    # Without appended rows, no rows are read or loaded.
+    tutorial.db.drop_all_table_rows("customers")
+
+    airflow_dag.cookbook1_validate_and_ingest_to_postgres(incremental=True)
+    assert tutorial.db.get_table_row_count("customers") == 0
+
+    # Only appended rows are loaded.
+    with open(tmp_path / "data/raw/customers.csv", "a") as f:
+        f.write(
+            "1,Female,Rosita,New York,NY,New York,10123,United States,"
+            "North America,1/1/1991\r\n"
+        )
+
+    airflow_dag.cookbook1_validate_and_ingest_to_postgres(incremental=True)
+    assert tutorial.db.get_table_row_count("customers") == 1
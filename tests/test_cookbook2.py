@@ -1,7 +1,9 @@
 """Tests for Cookbook2 functions."""
 
+import multiprocessing
 import shutil
-from typing import Tuple
+import time
+from typing import Optional, Tuple
 
 import cookbooks.airflow_dags.cookbook2_validate_and_handle_invalid_data as airflow_dag
 import great_expectations as gx
@@ -198,6 +200,77 @@ def test_clean_product_data(raw_product_data):
     )
 
 
+def test_clean_product_data_with_malformed_rows(raw_product_data):
+    """Test that rows with malformed cost or price figures are separated instead of raising an error."""
+    raw_product_data.loc[1, "Unit Price USD"] = "$1,299.OO"
+    raw_product_data.loc[2, "Unit Cost USD"] = None
+
+    df_products, df_product_categories, _, df_malformed = (
+        tutorial.cookbook2.clean_product_data_with_malformed_rows(raw_product_data)
+    )
+
+    assert list(df_products["product_id"]) == [1]
+    assert list(df_products["unit_price_usd"]) == [12.99]
+
+    # Dimensions are extracted from kept rows only.
+    assert list(df_product_categories["product_category_id"]) == [1]
+
+    assert list(df_malformed["product_id"]) == [374, 657]
+    assert list(df_malformed["unit_price_usd"]) == ["$1,299.OO", "$149.00 "]
+    assert df_malformed["unit_cost_usd"].isna().tolist() == [False, True]
+
+    # Malformed rows are labelled as invalid rows, with parsed figures for Postgres.
+    df_invalid = tutorial.cookbook2.get_malformed_product_rows(
+        df_malformed, parse_currency=True
+    )
+    assert (
+        list(df_invalid[tutorial.cookbook2.REASON_COLUMN])
+        == [tutorial.cookbook2.MALFORMED_CURRENCY_REASON] * 2
+    )
+    assert df_invalid["unit_price_usd"].isna().tolist() == [True, False]
+    assert df_invalid["unit_cost_usd"].tolist()[0] == 430.38
+
+    # Malformed rows are dropped from the default cleaning output.
+    df_products, _, _ = tutorial.cookbook2.clean_product_data(raw_product_data)
+    assert list(df_products["product_id"]) == [1]
+
+
+def test_clean_product_data_dimension_keys(raw_product_data):
+    """Test that integer-coded dimension keys index the dimension dataframes."""
+    df_products, df_product_categories, df_product_subcategories = (
+        tutorial.cookbook2.clean_product_data(raw_product_data, dimension_keys=True)
+    )
+
+    assert list(df_products["product_category_key"]) == [0, 1, 1]
+    assert list(df_products["product_subcategory_key"]) == [0, 1, 2]
+    assert list(df_product_categories.columns) == [
+        "product_category_key",
+        "product_category_id",
+        "name",
+    ]
+
+    category_ids = df_product_categories["product_category_id"].to_numpy()
+    assert list(category_ids[df_products["product_category_key"]]) == list(
+        df_products["product_category_id"]
+    )
+
+
+def test_extract_dimension_with_inconsistent_names():
+    """Test that ids with more than one name produce one dimension row per id/name pair."""
+    df_dimension, keys = tutorial.cookbook2._extract_dimension(
+        pd.Series([1, 2, 1, 1, 2]),
+        pd.Series(["a", "b", "a", "c", "b"]),
+        id_column="id",
+    )
+
+    assert df_dimension.to_dict(orient="records") == [
+        {"id": 1, "name": "a"},
+        {"id": 2, "name": "b"},
+        {"id": 1, "name": "c"},
+    ]
+    assert list(keys) == [0, 1, 0, 2, 1]
+
+
 def test_validate_valid_data(valid_product_data):
     """Test that validation of valid data succeeds as expected."""
 
@@ -248,6 +321,74 @@ def test_validate_invalid_data(invalid_product_data):
         assert result["success"] is False
 
 
+def test_validate_concurrently(invalid_product_data):
+    """Test that concurrent validation returns the same results as sequential validation."""
+    sequential_results = tutorial.cookbook2.validate_product_data(*invalid_product_data)
+
+    for use_processes in [False, True]:
+        concurrent_results = tutorial.cookbook2.validate_product_data(
+            *invalid_product_data,
+            concurrent_validation=True,
+            use_processes=use_processes,
+        )
+
+        for sequential_result, concurrent_result in zip(
+            sequential_results, concurrent_results
+        ):
+            assert isinstance(
+                concurrent_result,
+                gx.core.expectation_validation_result.ExpectationSuiteValidationResult,
+            )
+            assert [x["success"] for x in concurrent_result["results"]] == [
+                x["success"] for x in sequential_result["results"]
+            ]
+            assert [x["result"] for x in concurrent_result["results"]] == [
+                x["result"] for x in sequential_result["results"]
+            ]
+
+
+def test_validate_concurrently_isolates_errors(valid_product_data):
+    """Test that an error validating one table does not interrupt the other validations."""
+    df_products, _, df_product_subcategories = valid_product_data
+
+    with pytest.raises(Exception) as exc_info:
+        tutorial.cookbook2.validate_product_data(
+            df_products, None, df_product_subcategories, concurrent_validation=True
+        )
+
+    assert str(exc_info.value) == (
+        "GX data validation did not complete for: product categories. "
+        "Completed validations: products, product subcategories."
+    )
+
+
+def _slow_validation(table: str, df: pd.DataFrame, two_phase: bool = False):
+    """Stand-in for a product table validation that does not complete."""
+    time.sleep(60)
+
+
+def test_validate_concurrently_terminates_timed_out_processes(
+    valid_product_data, monkeypatch
+):
+    """Test that worker processes running timed out validations are terminated."""
+    monkeypatch.setattr(
+        tutorial.cookbook2, "_validate_product_table_in_process", _slow_validation
+    )
+
+    start = time.monotonic()
+
+    with pytest.raises(Exception, match="did not complete"):
+        tutorial.cookbook2.validate_product_data(
+            *valid_product_data,
+            concurrent_validation=True,
+            use_processes=True,
+            timeout=1,
+        )
+
+    assert multiprocessing.active_children() == []
+    assert time.monotonic() - start < 30
+
+
 def test_separate_valid_and_invalid_product_rows(
     valid_product_data, invalid_product_data
 ):
@@ -273,6 +414,182 @@ def test_separate_valid_and_invalid_product_rows(
     assert sorted(list(df_invalid["product_id"])) == [1234, 1934, 2133]
 
 
+def test_get_product_validity_mask(valid_product_data, invalid_product_data):
+    """Test that the validity mask flags invalid rows overall and per Expectation."""
+
+    df_products = pd.concat(
+        [valid_product_data[0], invalid_product_data[0]], axis=0
+    ).reset_index(drop=True)
+
+    validation_result, _, _ = tutorial.cookbook2.validate_product_data(
+        df_products, *valid_product_data[1:]
+    )
+
+    valid, df_expectation_valid = tutorial.cookbook2.get_product_validity_mask(
+        df_products, validation_result, by_expectation=True
+    )
+
+    assert valid.dtype == bool
+    assert sorted(df_products.loc[~valid, "product_id"]) == [1234, 1934, 2133]
+
+    assert sorted(df_expectation_valid.columns) == [
+        "expect_column_pair_values_a_to_be_greater_than_b(unit_price_usd, unit_cost_usd)",
+        "expect_column_values_to_be_between(unit_price_usd)",
+        "expect_table_columns_to_match_ordered_list()",
+    ]
+    assert df_expectation_valid.all(axis=1).to_numpy().tolist() == valid.tolist()
+
+    # Unexpected rows that do not match any product row raise instead of marking the
+    # last row invalid.
+    with pytest.raises(Exception, match="do not match any product row"):
+        tutorial.cookbook2.get_product_validity_mask(
+            df_products.iloc[:-1], validation_result
+        )
+
+
+def test_separate_valid_and_invalid_product_rows_two_phase(
+    valid_product_data, invalid_product_data
+):
+    """Test that two-phase Validation Results only contain detail for failed Expectations."""
+    validation_result, _, _ = tutorial.cookbook2.validate_product_data(
+        *valid_product_data, two_phase=True
+    )
+
+    assert validation_result["success"] is True
+    assert all(
+        "unexpected_index_list" not in x["result"] for x in validation_result["results"]
+    )
+
+    df_products = invalid_product_data[0]
+    complete_result, _, _ = tutorial.cookbook2.validate_product_data(
+        *invalid_product_data
+    )
+    validation_result, _, _ = tutorial.cookbook2.validate_product_data(
+        *invalid_product_data, two_phase=True
+    )
+
+    assert validation_result["success"] is False
+    assert validation_result["statistics"] == complete_result["statistics"]
+
+    for two_phase_rows, complete_rows in zip(
+        tutorial.cookbook2.separate_valid_and_invalid_product_rows(
+            df_products, validation_result
+        ),
+        tutorial.cookbook2.separate_valid_and_invalid_product_rows(
+            df_products, complete_result
+        ),
+    ):
+        pd.testing.assert_frame_equal(two_phase_rows, complete_rows)
+
+
+def test_separate_valid_and_invalid_product_rows_with_reasons(invalid_product_data):
+    """Test that invalid rows carry the Expectations they failed."""
+    df_products = invalid_product_data[0]
+
+    validation_result, _, _ = tutorial.cookbook2.validate_product_data(
+        *invalid_product_data
+    )
+
+    _, df_invalid = tutorial.cookbook2.separate_valid_and_invalid_product_rows(
+        df_products, validation_result, reason_column="reason"
+    )
+
+    reasons = dict(zip(df_invalid["product_id"], df_invalid["reason"]))
+
+    assert reasons[2133] == (
+        "expect_column_pair_values_a_to_be_greater_than_b(unit_price_usd, unit_cost_usd); "
+        "expect_column_values_to_be_between(unit_price_usd)"
+    )
+    assert reasons[1234] == "expect_column_values_to_be_between(unit_price_usd)"
+    assert reasons[1934] == (
+        "expect_column_pair_values_a_to_be_greater_than_b(unit_price_usd, unit_cost_usd)"
+    )
+
+
+def test_get_product_foreign_key_validity(valid_product_data):
+    """Test that orphan product rows are flagged against cleaned and existing dimension keys."""
+    df_products, df_product_categories, df_product_subcategories = valid_product_data
+    df_products.loc[1, "product_subcategory_id"] = 101
+
+    df_foreign_key_valid = tutorial.cookbook2.get_product_foreign_key_validity(
+        df_products,
+        {
+            "product_category": df_product_categories,
+            "product_subcategory": df_product_subcategories,
+        },
+        include_existing=False,
+    )
+
+    assert df_foreign_key_valid.to_dict(orient="list") == {
+        "foreign_key(product_category_id)": [False, False],
+        "foreign_key(product_subcategory_id)": [False, True],
+    }
+
+    # Keys already loaded to Postgres are also accepted.
+    for table_name in ["product_category", "product_subcategory"]:
+        tutorial.db.drop_all_table_rows(table_name)
+
+    tutorial.db.insert_ignore_dataframe_to_postgres(
+        "product_category", pd.DataFrame([{"product_category_id": 8, "name": "c"}])
+    )
+
+    df_foreign_key_valid = tutorial.cookbook2.get_product_foreign_key_validity(
+        df_products,
+        {"product_subcategory": df_product_subcategories},
+    )
+
+    assert df_foreign_key_valid.to_dict(orient="list") == {
+        "foreign_key(product_category_id)": [True, True],
+        "foreign_key(product_subcategory_id)": [False, True],
+    }
+
+    # Orphan rows are separated as invalid rows, with the failed check as the reason.
+    validation_result, _, _ = tutorial.cookbook2.validate_product_data(
+        *valid_product_data
+    )
+
+    df_valid, df_invalid = tutorial.cookbook2.separate_valid_and_invalid_product_rows(
+        df_products,
+        validation_result,
+        reason_column="reason",
+        foreign_key_validity=df_foreign_key_valid,
+    )
+
+    assert list(df_valid["product_id"]) == [2467]
+    assert list(df_invalid["product_id"]) == [2486]
+    assert list(df_invalid["reason"]) == ["foreign_key(product_subcategory_id)"]
+
+
+@pytest.mark.parametrize(
+    "filename,file_format", [("rows.csv.gz", "csv"), ("rows.parquet", "parquet")]
+)
+def test_write_invalid_rows_to_file(
+    tmp_path, invalid_product_data, filename, file_format
+):
+    """Test writing invalid rows to partitioned, appended csv and parquet files."""
+    df_products = invalid_product_data[0]
+
+    for run_date in ["2024-01-01", "2024-01-01", "2024-01-02"]:
+        tutorial.cookbook2.write_invalid_rows_to_file(
+            tmp_path / filename,
+            df_products,
+            file_format=file_format,
+            partition_by={"run_date": run_date},
+            append=True,
+        )
+
+    partition_dir = tmp_path / "run_date=2024-01-01"
+
+    if file_format == "csv":
+        df = pd.read_csv(partition_dir / filename)
+    else:
+        assert len(list(partition_dir.glob("*.parquet"))) == 2
+        df = pd.read_parquet(partition_dir)
+
+    assert df.shape == (2 * df_products.shape[0], df_products.shape[1])
+    assert sorted(df["product_id"]) == sorted(list(df_products["product_id"]) * 2)
+
+
 def test_cookbook2_airflow_dag(tmp_path, monkeypatch):
     """Test Airflow DAG code runs without error."""
 
@@ -319,3 +636,133 @@ def test_cookbook2_airflow_dag(tmp_path, monkeypatch):
     )
     expected_invalid_row_ids = [14, 50, 919, 920, 921, 922, 975]
     assert invalid_row_ids == expected_invalid_row_ids
+
+
+def test_write_invalid_rows_to_postgres(invalid_product_data):
+    """Test that invalid rows are loaded into the quarantine table with run metadata."""
+    df_products = invalid_product_data[0].assign(failed_expectations="reason")
+
+    tutorial.db.drop_all_table_rows("products_quarantine")
+
+    rows_loaded = tutorial.cookbook2.write_invalid_rows_to_postgres(
+        df_products, run_id="test_run"
+    )
+
+    assert rows_loaded == 3
+
+    df_quarantine = pd.read_sql_query(
+        "select * from products_quarantine order by product_id",
+        con=tutorial.db.get_local_postgres_engine(),
+    )
+
+    assert list(df_quarantine["product_id"]) == [1234, 1934, 2133]
+    assert set(df_quarantine["run_id"]) == {"test_run"}
+    assert set(df_quarantine["failed_expectations"]) == {"reason"}
+    assert df_quarantine["quarantined_at"].notna().all()
+
+
+def test_cookbook2_airflow_dag_quarantine(tmp_path, monkeypatch):
+    """Test Airflow DAG code writes invalid rows to the quarantine table."""
+
+    (tmp_path / "data" / "raw").mkdir(parents=True)
+
+    def mock_get_airflow_home_dir():
+        return tmp_path
+
+    monkeypatch.setattr(airflow_dag, "get_airflow_home_dir", mock_get_airflow_home_dir)
+
+    shutil.copy("/cookbooks/data/raw/products.csv", tmp_path / "data/raw")
+
+    tutorial.db.drop_all_table_rows("products_quarantine")
+
+    airflow_dag.cookbook2_validate_and_handle_invalid_data(
+        run_id="test_run", invalid_rows_sink="postgres"
+    )
+
+    df_quarantine = pd.read_sql_query(
+        "select product_id, run_id from products_quarantine",
+        con=tutorial.db.get_local_postgres_engine(),
+    )
+
+    assert sorted(df_quarantine["product_id"]) == [14, 50, 919, 920, 921, 922, 975]
+    assert set(df_quarantine["run_id"]) == {"test_run"}
+
+
+def test_cookbook2_airflow_dag_skip_unchanged(tmp_path, monkeypatch):
+    """Test Airflow DAG code skips a run when the raw product data is unchanged."""
+
+    (tmp_path / "data" / "raw").mkdir(parents=True)
+    (tmp_path / "airflow_pipeline_output").mkdir(parents=True)
+
+    def mock_get_airflow_home_dir():
+        return tmp_path
+
+    monkeypatch.setattr(airflow_dag, "get_airflow_home_dir", mock_get_airflow_home_dir)
+
+    shutil.copy("/cookbooks/data/raw/products.csv", tmp_path / "data/raw")
+
+    tutorial.db.drop_all_table_rows("products")
+
+    airflow_dag.cookbook2_validate_and_handle_invalid_data(skip_unchanged=True)
+    assert tutorial.db.get_table_row_count("products") == 2510
+
+    # The second run with the same raw data is skipped.
+    tutorial.db.drop_all_table_rows("products")
+
+    airflow_dag.cookbook2_validate_and_handle_invalid_data(skip_unchanged=True)
+    assert tutorial.db.get_table_row_count("products") == 0
+
+
+def _run_in_daemon_process(function, *args, **kwargs) -> Optional[str]:
+    """Run a function in a forked daemonic process, as the Airflow LocalExecutor runs tasks, and return any raised error."""
+    context = multiprocessing.get_context("fork")
+    errors = context.Queue()
+
+    def target():
+        try:
+            function(*args, **kwargs)
+            errors.put(None)
+        except BaseException as e:
+            errors.put(repr(e))
+
+    process = context.Process(target=target, daemon=True)
+    process.start()
+    error = errors.get(timeout=600)
+    process.join()
+
+    return error
+
+
+def test_cookbook2_airflow_dag_in_daemon_process(
+    tmp_path, monkeypatch, valid_product_data
+):
+    """Test Airflow DAG code runs in a daemonic process, as with the Airflow LocalExecutor."""
+
+    (tmp_path / "data" / "raw").mkdir(parents=True)
+    (tmp_path / "airflow_pipeline_output").mkdir(parents=True)
+
+    def mock_get_airflow_home_dir():
+        return tmp_path
+
+    monkeypatch.setattr(airflow_dag, "get_airflow_home_dir", mock_get_airflow_home_dir)
+
+    shutil.copy("/cookbooks/data/raw/products.csv", tmp_path / "data/raw")
+
+    tutorial.db.drop_all_table_rows("products")
+
+    assert (
+        _run_in_daemon_process(airflow_dag.cookbook2_validate_and_handle_invalid_data)
+        is None
+    )
+    assert tutorial.db.get_table_row_count("products") == 2510
+
+    # Validation in worker processes falls back to threads in a daemonic process.
+    assert (
+        _run_in_daemon_process(
+            tutorial.cookbook2.validate_product_data,
+            *valid_product_data,
+            concurrent_validation=True,
+            use_processes=True,
+        )
+        is None
+    )
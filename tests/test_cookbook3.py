@@ -1,4 +1,5 @@
 import altair as alt
+import numpy as np
 import tutorial_code as tutorial
 
 
@@ -12,3 +13,147 @@ def test_visualize_customer_income_distribution():
     """Test that an altair chart is returned for distribution visualizations."""
     chart = tutorial.cookbook3.visualize_customer_income_distribution()
     assert isinstance(chart, alt.Chart)
+
+
+def test_iter_customer_profile_data():
+    """Test that customer profile data is streamed in chunks of the selected columns."""
+    chunks = tutorial.cookbook3._iter_customer_profile_data(
+        columns=["age"], chunksize=1_000
+    )
+
+    df_chunk = next(chunks)
+    chunks.close()
+
+    assert list(df_chunk.columns) == ["age"]
+    assert df_chunk.shape[0] <= 1_000
+
+
+def test_histogram_bin_counts_pushdown():
+    """Test that bin counts computed in the database match counts binned client-side."""
+    bins = tutorial.cookbook3.BINS
+
+    pushdown_counts = tutorial.cookbook3._histogram_bin_counts("age", bins)
+    client_counts = tutorial.cookbook3._histogram_bin_counts(
+        "age", bins, pushdown=False
+    )
+
+    assert np.array_equal(pushdown_counts, client_counts)
+
+
+def test_load_customer_profile_data_is_cached():
+    """Test that customer profile data is fetched once and reused by later calls."""
+    tutorial.cookbook3.invalidate_customer_profile_cache()
+
+    df = tutorial.cookbook3._load_customer_profile_data()
+    assert tutorial.cookbook3._load_customer_profile_data() is df
+
+    # Column subsets are served from the cached dataset.
+    df_age = tutorial.cookbook3._load_customer_profile_data(columns=["age"])
+    assert df_age["age"].equals(df["age"])
+
+    tutorial.cookbook3.invalidate_customer_profile_cache()
+    assert tutorial.cookbook3._get_cached_customer_profile_data() is None
+
+
+def test_count_values_in_bins():
+    """Test that values are counted in right-closed bins, matching pd.cut."""
+    values = np.array([0, 1, 10, 10.5, 20, 25, np.nan, -5])
+    bin_edges = np.array([0, 10, 20, 30])
+
+    counts = tutorial.cookbook3._count_values_in_bins(values, bin_edges)
+    assert list(counts) == [2, 2, 1]
+
+    counts = tutorial.cookbook3._count_values_in_bins(
+        values, bin_edges, include_lowest=True
+    )
+    assert list(counts) == [3, 2, 1]
+
+
+def test_format_bin_labels():
+    """Test that bin labels use positional notation for large and fractional edges."""
+    labels = tutorial.cookbook3._format_bin_labels(
+        np.array([0, 2.5e6, 0.125]), np.array([1e6, 12345678.0, 0.3])
+    )
+    assert list(labels) == ["0-1000000", "2500000-12345678", "0.12-0.3"]
+
+    labels = tutorial.cookbook3._format_income_bin_labels(
+        np.array([0, 1e7, 2.5e7]), np.array([1e7, 2.5e7, 1e8])
+    )
+    assert list(labels) == ["Less than $10000k", "$10000k-25000k", "$25000k+"]
+
+
+def test_build_customer_profile_histogram():
+    """Test histogram data for fixed and adaptive bins."""
+    df_hist = tutorial.cookbook3.build_customer_profile_histogram(
+        "annual_income_usd",
+        bins=[0, 10_000, 50_000, 100_000],
+        format_labels=tutorial.cookbook3._format_income_bin_labels,
+    )
+
+    assert list(df_hist.columns) == [
+        "binterval_str",
+        "bin_lower",
+        "bin_mid",
+        "bin_upper",
+        "count",
+    ]
+    assert list(df_hist["binterval_str"]) == [
+        "Less than $10k",
+        "$10k-50k",
+        "$50k+",
+    ]
+    assert list(df_hist["bin_mid"]) == [5_000, 30_000, 75_000]
+
+    df_hist = tutorial.cookbook3.build_customer_profile_histogram("age", bins=5)
+    df_age = tutorial.cookbook3._load_customer_profile_data(["age"])
+
+    assert len(df_hist) == 5
+    assert df_hist["count"].sum() == df_age["age"].notna().sum()
+
+
+def test_column_sketch():
+    """Test that merged sketches match a sketch of all values and estimate quantiles."""
+    rng = np.random.default_rng(42)
+    values = rng.integers(1, 100, size=10_000).astype(float)
+    values[:10] = np.nan
+
+    sketch = tutorial.cookbook3.ColumnSketch(tutorial.cookbook3.BINS)
+    sketch.update(values)
+
+    sketch_a = tutorial.cookbook3.ColumnSketch(tutorial.cookbook3.BINS)
+    sketch_a.update(values[:3_000])
+    sketch_b = tutorial.cookbook3.ColumnSketch(tutorial.cookbook3.BINS)
+    sketch_b.update(values[3_000:])
+    sketch_a.merge(sketch_b)
+
+    assert sketch_a.to_dict() == sketch.to_dict()
+    assert sketch.count == 9_990
+    assert sketch.null_count == 10
+    assert list(sketch.bin_counts) == list(
+        tutorial.cookbook3._count_values_in_bins(values, np.array(sketch.bin_edges))
+    )
+
+    q = [0.1, 0.5, 0.9]
+    assert np.allclose(
+        sketch.quantiles(q),
+        np.nanquantile(values, q),
+        rtol=2 * tutorial.cookbook3.SKETCH_RELATIVE_ACCURACY,
+    )
+
+    sketch_roundtrip = tutorial.cookbook3.ColumnSketch.from_dict(sketch.to_dict())
+    assert sketch_roundtrip.to_dict() == sketch.to_dict()
+    assert tutorial.cookbook3.population_stability_index(sketch, sketch_roundtrip) == 0
+
+
+def test_update_customer_profile_sketches(tmp_path):
+    """Test that persisted sketches are only updated with new customer profile rows."""
+    filepath = tmp_path / tutorial.cookbook3.SKETCH_FILENAME
+
+    sketches = tutorial.cookbook3.update_customer_profile_sketches(filepath)
+    df_age = tutorial.cookbook3._load_customer_profile_data(["age"])
+
+    assert filepath.exists()
+    assert sketches["age"].count == df_age["age"].notna().sum()
+
+    sketches_updated = tutorial.cookbook3.update_customer_profile_sketches(filepath)
+    assert sketches_updated["age"].to_dict() == sketches["age"].to_dict()
@@ -0,0 +1,289 @@
+"""Tests for Postgres helper functions."""
+
+import pandas as pd
+import pytest
+import tutorial_code as tutorial
+
+
+@pytest.fixture
+def customer_data() -> pd.DataFrame:
+    """Return cleaned customer data, including null and empty string values."""
+    return pd.DataFrame(
+        [
+            {
+                "customer_id": 1,
+                "name": "Big Bird",
+                "city": "New York",
+                "state": "NY",
+                "zip": "10123",
+                "country": "US",
+            },
+            {
+                "customer_id": 2,
+                "name": "Elmo, Jr.",
+                "city": None,
+                "state": "",
+                "zip": "10123",
+                "country": "US",
+            },
+        ]
+    )
+
+
+def test_get_engine_reuses_pooled_engines():
+    """Test that engines are created once per connection string and pool settings."""
+    engine = tutorial.db.get_local_postgres_engine()
+
+    assert tutorial.db.get_local_postgres_engine() is engine
+    assert engine.pool.size() == tutorial.db.POOL_SIZE
+
+    small_pool_engine = tutorial.db.get_engine(
+        tutorial.db.TUTORIAL_POSTGRES_CONNECTION_STRING, pool_size=1
+    )
+    assert small_pool_engine is not engine
+    assert small_pool_engine.pool.size() == 1
+
+
+def test_bulk_insert_ignore_dataframe_to_postgres(customer_data):
+    """Test that COPY-based insert ignore returns the number of new rows inserted."""
+    tutorial.db.drop_all_table_rows("customers")
+
+    rows_inserted = tutorial.db.bulk_insert_ignore_dataframe_to_postgres(
+        "customers", customer_data
+    )
+    assert rows_inserted == 2
+
+    # Existing primary keys are ignored.
+    rows_inserted = tutorial.db.bulk_insert_ignore_dataframe_to_postgres(
+        "customers", customer_data
+    )
+    assert rows_inserted == 0
+    assert tutorial.db.get_table_row_count("customers") == 2
+
+    df_customers = pd.read_sql_query(
+        "select * from customers order by customer_id",
+        con=tutorial.db.get_local_postgres_engine(),
+    )
+    assert df_customers.to_dict(orient="records")[1] == {
+        "customer_id": 2,
+        "name": "Elmo, Jr.",
+        "city": None,
+        "state": "",
+        "zip": "10123",
+        "country": "US",
+    }
+
+
+def test_bulk_insert_ignore_dataframe_to_postgres_with_null_integers():
+    """Test that integer columns held as float64 because of nulls are loaded with COPY."""
+    df_products = pd.DataFrame(
+        [
+            {
+                "product_id": 1,
+                "name": "Contoso Coffee Maker",
+                "unit_price_usd": 30.0,
+                "product_category_id": None,
+            },
+            {
+                "product_id": 2,
+                "name": "Contoso Kettle",
+                "unit_price_usd": 12.5,
+                "product_category_id": 8,
+            },
+        ]
+    )
+    assert df_products["product_category_id"].dtype == "float64"
+
+    tutorial.db.drop_all_table_rows("products")
+
+    rows_inserted = tutorial.db.bulk_insert_ignore_dataframe_to_postgres(
+        "products", df_products
+    )
+    assert rows_inserted == 2
+
+    df_loaded = pd.read_sql_query(
+        "select product_id, unit_price_usd, product_category_id from products "
+        "order by product_id",
+        con=tutorial.db.get_local_postgres_engine(),
+    )
+    assert list(df_loaded["unit_price_usd"]) == [30.0, 12.5]
+    assert df_loaded["product_category_id"].isna().tolist() == [True, False]
+    assert df_loaded["product_category_id"].iloc[1] == 8
+
+
+def test_bulk_insert_ignore_dataframes_to_postgres():
+    """Test that several tables are loaded in one transaction, and rolled back together."""
+    df_categories = pd.DataFrame([{"product_category_id": 1, "name": "category 1"}])
+    df_subcategories = pd.DataFrame(
+        [{"product_subcategory_id": 101, "name": "subcategory 101"}]
+    )
+
+    for table_name in ["product_category", "product_subcategory"]:
+        tutorial.db.drop_all_table_rows(table_name)
+
+    rows_inserted = tutorial.db.bulk_insert_ignore_dataframes_to_postgres(
+        {"product_category": df_categories, "product_subcategory": df_subcategories}
+    )
+    assert rows_inserted == {"product_category": 1, "product_subcategory": 1}
+
+    # A failure loading any table rolls back rows inserted into earlier tables.
+    with pytest.raises(Exception):
+        tutorial.db.bulk_insert_ignore_dataframes_to_postgres(
+            {
+                "product_category": pd.DataFrame(
+                    [{"product_category_id": 2, "name": "category 2"}]
+                ),
+                "product_subcategory": df_subcategories.assign(unknown_column=1),
+            }
+        )
+
+    assert tutorial.db.get_table_row_count("product_category") == 1
+    assert tutorial.db.get_table_row_count("product_subcategory") == 1
+
+    # The same table can be loaded more than once in a single transaction.
+    with tutorial.db.begin_local_postgres_transaction() as connection:
+        for product_category_id in [2, 3]:
+            tutorial.db.bulk_insert_ignore_dataframes_to_postgres(
+                {
+                    "product_category": pd.DataFrame(
+                        [{"product_category_id": product_category_id, "name": "x"}]
+                    )
+                },
+                connection=connection,
+            )
+
+    assert tutorial.db.get_table_row_count("product_category") == 3
+
+    # Appends made on the same connection are rolled back with the load.
+    tutorial.db.drop_all_table_rows("products_quarantine")
+
+    with pytest.raises(Exception):
+        with tutorial.db.begin_local_postgres_transaction() as connection:
+            tutorial.db.bulk_append_dataframe_to_postgres(
+                "products_quarantine",
+                pd.DataFrame([{"run_id": "test_run", "product_id": 1}]),
+                connection=connection,
+            )
+            tutorial.db.bulk_insert_ignore_dataframes_to_postgres(
+                {"product_subcategory": df_subcategories.assign(unknown_column=1)},
+                connection=connection,
+            )
+
+    assert tutorial.db.get_table_row_count("products_quarantine") == 0
+
+
+def test_delta_upsert_dataframe_to_postgres(customer_data):
+    """Test that only new or changed rows are written, and counted by outcome."""
+    tutorial.db.drop_all_table_rows("customers")
+
+    row_counts = tutorial.db.delta_upsert_dataframe_to_postgres(
+        "customers", customer_data
+    )
+    assert row_counts == {"inserted": 2, "updated": 0, "unchanged": 0}
+
+    # Unchanged rows are skipped.
+    row_counts = tutorial.db.delta_upsert_dataframe_to_postgres(
+        "customers", customer_data
+    )
+    assert row_counts == {"inserted": 0, "updated": 0, "unchanged": 2}
+
+    # Changed rows are updated and new rows inserted.
+    customer_data.loc[1, "city"] = "Sesame Street"
+    customer_data.loc[2] = [3, "Grover", "New York", "NY", "10123", "US"]
+
+    row_counts = tutorial.db.delta_upsert_dataframe_to_postgres(
+        "customers", customer_data
+    )
+    assert row_counts == {"inserted": 1, "updated": 1, "unchanged": 1}
+
+    df_customers = pd.read_sql_query(
+        "select customer_id, city from customers order by customer_id",
+        con=tutorial.db.get_local_postgres_engine(),
+    )
+    assert list(df_customers["city"]) == ["New York", "Sesame Street", "New York"]
+
+    # Rows dropped from the table are reloaded.
+    tutorial.db.drop_all_table_rows("customers")
+
+    row_counts = tutorial.db.delta_upsert_dataframe_to_postgres(
+        "customers", customer_data
+    )
+    assert row_counts == {"inserted": 3, "updated": 0, "unchanged": 0}
+
+    # Rows deleted without clearing their stored hashes are also reloaded.
+    tutorial.db._run_query("delete from customers where customer_id in (1, 2)")
+
+    row_counts = tutorial.db.delta_upsert_dataframe_to_postgres(
+        "customers", customer_data
+    )
+    assert row_counts == {"inserted": 2, "updated": 0, "unchanged": 1}
+
+    # Of rows with duplicate keys, the last is loaded.
+    df_duplicates = pd.concat(
+        [customer_data, customer_data.iloc[[0]].assign(city="Oscar's Can")]
+    )
+
+    row_counts = tutorial.db.delta_upsert_dataframe_to_postgres(
+        "customers", df_duplicates
+    )
+    assert row_counts == {"inserted": 0, "updated": 1, "unchanged": 2}
+    assert tutorial.db.get_table_row_count("customers") == 3
+
+
+def test_get_table_schemas():
+    """Test that table schemas are returned for multiple tables and cached."""
+    tutorial.db.invalidate_table_schema_cache()
+
+    schemas = tutorial.db.get_table_schemas(["customers", "product_category"])
+
+    assert sorted(schemas.keys()) == ["customers", "product_category"]
+    assert schemas["customers"].to_dict(orient="records") == [
+        {
+            "column": "customer_id",
+            "data_type": "bigint",
+            "nullable": False,
+            "primary_key": True,
+        },
+        {"column": "name", "data_type": "text", "nullable": True, "primary_key": False},
+        {"column": "city", "data_type": "text", "nullable": True, "primary_key": False},
+        {
+            "column": "state",
+            "data_type": "text",
+            "nullable": True,
+            "primary_key": False,
+        },
+        {"column": "zip", "data_type": "text", "nullable": True, "primary_key": False},
+        {
+            "column": "country",
+            "data_type": "varchar(2)",
+            "nullable": True,
+            "primary_key": False,
+        },
+    ]
+
+    # Cached schemas are returned without querying the database again.
+    assert "customers" in tutorial.db._table_schema_cache
+    assert tutorial.db.get_table_schema("customers").equals(schemas["customers"])
+
+    tutorial.db.invalidate_table_schema_cache("customers")
+    assert "customers" not in tutorial.db._table_schema_cache
+    assert "product_category" in tutorial.db._table_schema_cache
+
+
+def test_get_table_row_count_estimate(customer_data):
+    """Test that small or unanalyzed tables fall back to an exact row count."""
+    tutorial.db.drop_all_table_rows("customers")
+    tutorial.db.bulk_insert_ignore_dataframe_to_postgres("customers", customer_data)
+
+    assert tutorial.db.get_table_row_count_estimate("customers") == (2, True)
+
+    # Estimates are returned for tables at or above the exact count threshold.
+    tutorial.db._run_query("analyze customers")
+    row_count, exact = tutorial.db.get_table_row_count_estimate(
+        "customers", exact_threshold=0
+    )
+    assert (row_count, exact) == (2, False)
+
+    assert tutorial.db.get_table_row_count_estimate(
+        "customers", exact=True, exact_threshold=0
+    ) == (2, True)
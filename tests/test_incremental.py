@@ -0,0 +1,123 @@
+"""Tests for incremental ingestion helper functions."""
+
+import json
+import os
+
+import tutorial_code as tutorial
+
+
+def test_read_appended_csv(tmp_path):
+    """Test that only appended rows are read, and rewritten files are read in full."""
+    filepath = tmp_path / "data.csv"
+    watermark_filepath = tmp_path / "watermarks.json"
+
+    filepath.write_bytes(b"id,name\n1,a\n2,b\n")
+
+    df, watermark = tutorial.incremental.read_appended_csv(filepath, watermark_filepath)
+    assert list(df["id"]) == [1, 2]
+    assert watermark["rows"] == 2
+
+    # Without a persisted watermark, the same rows are read again.
+    df, watermark = tutorial.incremental.read_appended_csv(filepath, watermark_filepath)
+    assert list(df["id"]) == [1, 2]
+
+    tutorial.incremental.write_watermark(watermark_filepath, filepath, watermark)
+    assert (
+        tutorial.incremental.read_watermark(watermark_filepath, filepath) == watermark
+    )
+
+    # Appended rows are read, excluding a trailing partial line.
+    with open(filepath, "ab") as f:
+        f.write(b"3,c\n4,")
+
+    df, watermark = tutorial.incremental.read_appended_csv(filepath, watermark_filepath)
+    assert list(df.columns) == ["id", "name"]
+    assert list(df["id"]) == [3]
+    assert watermark["rows"] == 3
+
+    tutorial.incremental.write_watermark(watermark_filepath, filepath, watermark)
+
+    with open(filepath, "ab") as f:
+        f.write(b"d\n")
+
+    df, watermark = tutorial.incremental.read_appended_csv(filepath, watermark_filepath)
+    assert list(df["id"]) == [4]
+    assert watermark["rows"] == 4
+
+    tutorial.incremental.write_watermark(watermark_filepath, filepath, watermark)
+
+    df, _ = tutorial.incremental.read_appended_csv(filepath, watermark_filepath)
+    assert df.empty
+
+    # A final line without a line break is held back once, then read if unchanged.
+    with open(filepath, "ab") as f:
+        f.write(b"5,e")
+
+    df, watermark = tutorial.incremental.read_appended_csv(filepath, watermark_filepath)
+    assert df.empty
+
+    tutorial.incremental.write_watermark(watermark_filepath, filepath, watermark)
+
+    df, watermark = tutorial.incremental.read_appended_csv(filepath, watermark_filepath)
+    assert list(df["id"]) == [5]
+    assert watermark["rows"] == 5
+
+    tutorial.incremental.write_watermark(watermark_filepath, filepath, watermark)
+
+    df, _ = tutorial.incremental.read_appended_csv(filepath, watermark_filepath)
+    assert df.empty
+
+    # A rewritten file is read in full, even when it is not shorter.
+    filepath.write_bytes(b"id,name\n1,a\n2,x\n3,c\n4,d\n5,e\n6,f\n")
+
+    df, watermark = tutorial.incremental.read_appended_csv(filepath, watermark_filepath)
+    assert list(df["id"]) == [1, 2, 3, 4, 5, 6]
+    assert watermark["rows"] == 6
+
+
+def test_check_input_unchanged(tmp_path):
+    """Test that files are unchanged only if their contents match the last successful run."""
+    filepath = tmp_path / "data.csv"
+    fingerprint_filepath = tmp_path / "fingerprints.json"
+
+    filepath.write_bytes(b"id,name\n1,a\n")
+
+    unchanged, fingerprint = tutorial.incremental.check_input_unchanged(
+        fingerprint_filepath, filepath
+    )
+    assert not unchanged
+
+    tutorial.incremental.write_input_fingerprint(
+        fingerprint_filepath, filepath, fingerprint
+    )
+
+    unchanged, _ = tutorial.incremental.check_input_unchanged(
+        fingerprint_filepath, filepath
+    )
+    assert unchanged
+
+    # The same contents delivered again are unchanged, and the new mtime is recorded.
+    os.utime(filepath, ns=(0, fingerprint["mtime_ns"] + 10**9))
+
+    unchanged, fingerprint = tutorial.incremental.check_input_unchanged(
+        fingerprint_filepath, filepath
+    )
+    assert unchanged
+    assert json.loads(fingerprint_filepath.read_text())[str(filepath)] == fingerprint
+
+    # A file with the recorded size and mtime is not read, changed contents of the same
+    # size are detected once the mtime differs.
+    filepath.write_bytes(b"id,name\n1,b\n")
+    os.utime(filepath, ns=(0, fingerprint["mtime_ns"]))
+
+    unchanged, _ = tutorial.incremental.check_input_unchanged(
+        fingerprint_filepath, filepath
+    )
+    assert unchanged
+
+    os.utime(filepath, ns=(0, fingerprint["mtime_ns"] + 1))
+
+    unchanged, _ = tutorial.incremental.check_input_unchanged(
+        fingerprint_filepath, filepath
+    )
+    assert not unchanged
@@ -0,0 +1,5 @@
+#!/bin/bash
+
+printf "Running tutorial code benchmarks...\n\n"
+docker exec -t tutorial-gx-in-the-data-pipeline-jupyterlab bash -c 'cd / && for benchmark in /benchmarks/benchmark_*.py; do python -m benchmarks.$(basename ${benchmark} .py); done'
+printf "Completed tutorial code benchmarks.\n"